@@ -1,12 +1,43 @@
-import pygame
-import pytmx
-from pytmx.util_pygame import load_pygame
 import os
 import sys
+import time
+# Start of --measure-startup's 'imports' stage
+IMPORT_START = time.perf_counter()
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import pygame
+import json
 import random
 import math
+import argparse
+import contextlib
+import io
+import hashlib
+import shutil
+import struct
+import threading
+import concurrent.futures
+import weakref
+from collections import OrderedDict, deque
 from enum import Enum
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Baked maps never need pytmx, so it is imported by load_pytmx() the first
+# time a TMX has to be parsed rather than at startup. Anything holding a
+# tmx_data came through GameMap.parse_tmx(), so it can use the name directly.
+pytmx = None
+
+
+def load_pytmx():
+    global pytmx
+    if pytmx is None:
+        # Binds the module-level pytmx, with util_pygame loaded
+        import pytmx.util_pygame
+    return pytmx
+
 
 class State(Enum):
     IDLE = 0
@@ -15,15 +46,426 @@ class State(Enum):
     DEAD = 3
 
 
+class SpriteAtlas:
+    """Runtime side of the sprite atlas built by build_atlas().
+
+    The manifest maps frame ids (paths relative to the image folder, with
+    forward slashes) to a page and sub-rect. Pages are loaded on first use
+    and frames are handed out as subsurfaces. A frame whose source file has
+    changed since the atlas was built is skipped, so AssetCache falls back
+    to loading the file itself.
+    """
+
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.root = os.path.dirname(os.path.abspath(manifest_path))
+        self.frames = None
+        self.page_files = []
+        self.pages = {}
+
+    def load_manifest(self):
+        self.frames = {}
+        if not os.path.exists(self.manifest_path):
+            return
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            self.page_files = manifest['pages']
+            self.frames = manifest['frames']
+            print(f"Loaded sprite atlas: {len(self.frames)} frames on {len(self.page_files)} page(s)")
+        except Exception as e:
+            print(f"Error loading sprite atlas {self.manifest_path}: {e}")
+            self.frames = {}
+
+    def frame_id(self, path):
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        return rel.replace(os.sep, '/')
+
+    def page(self, index):
+        page = self.pages.get(index)
+        if page is None:
+            page = self.pages[index] = pygame.image.load(
+                os.path.join(self.root, self.page_files[index])).convert_alpha()
+        return page
+
+    def frame(self, path):
+        """Subsurface for the image at path, or None if the atlas does not have it"""
+        if self.frames is None:
+            self.load_manifest()
+        entry = self.frames.get(self.frame_id(path))
+        if entry is None:
+            return None
+        try:
+            if os.path.exists(path) and os.stat(path).st_mtime_ns != entry['mtime_ns']:
+                return None
+            return self.page(entry['page']).subsurface(entry['rect'])
+        except Exception as e:
+            print(f"Error reading {path} from sprite atlas: {e}")
+            return None
+
+
+def pack_shelves(sizes, max_size=2048, padding=1):
+    """Place (w, h) boxes on shelves, tallest first; returns (page, x, y) per box"""
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    placements = [None] * len(sizes)
+    page = x = y = shelf_h = 0
+    for i in order:
+        w = sizes[i][0] + padding
+        h = sizes[i][1] + padding
+        if w > max_size or h > max_size:
+            raise ValueError(f"sprite of size {sizes[i]} does not fit in a {max_size}px atlas")
+        if x + w > max_size:
+            x = 0
+            y += shelf_h
+            shelf_h = 0
+        if y + h > max_size:
+            page += 1
+            x = y = shelf_h = 0
+        placements[i] = (page, x, y)
+        x += w
+        shelf_h = max(shelf_h, h)
+    return placements
+
+
+def build_atlas(image_dir, name='atlas', max_size=2048, padding=1):
+    """Pack every sprite under image_dir into atlas page PNGs plus a JSON manifest"""
+    outputs = (f'{name}.png', f'{name}.json')
+    sources = []
+    for dirpath, dirnames, filenames in os.walk(image_dir):
+        dirnames.sort()
+        for fn in sorted(filenames):
+            if not fn.lower().endswith(('.png', '.jpg', '.bmp')):
+                continue
+            if dirpath == image_dir and (fn in outputs or fn.startswith(f'{name}_')):
+                continue
+            sources.append(os.path.join(dirpath, fn))
+
+    images = []
+    for path in sources:
+        try:
+            images.append((path, pygame.image.load(path)))
+        except Exception as e:
+            print(f"Skipping {path}: {e}")
+
+    placements = pack_shelves([img.get_size() for _, img in images], max_size, padding)
+    page_count = max((p[0] for p in placements), default=-1) + 1
+    page_sizes = [[0, 0] for _ in range(page_count)]
+    for (_, img), (page, x, y) in zip(images, placements):
+        page_sizes[page][0] = max(page_sizes[page][0], x + img.get_width())
+        page_sizes[page][1] = max(page_sizes[page][1], y + img.get_height())
+
+    pages = [pygame.Surface(size, pygame.SRCALPHA) for size in page_sizes]
+    page_files = [f'{name}.png' if i == 0 else f'{name}_{i}.png' for i in range(page_count)]
+    frames = {}
+    for (path, img), (page, x, y) in zip(images, placements):
+        pages[page].blit(img, (x, y))
+        frame_id = os.path.relpath(path, image_dir).replace(os.sep, '/')
+        frames[frame_id] = {'page': page, 'rect': [x, y, img.get_width(), img.get_height()],
+                            'mtime_ns': os.stat(path).st_mtime_ns}
+
+    for surf, fn in zip(pages, page_files):
+        pygame.image.save(surf, os.path.join(image_dir, fn))
+    manifest = {'version': 1, 'pages': page_files, 'frames': frames}
+    with open(os.path.join(image_dir, f'{name}.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    print(f"Packed {len(frames)} sprites into {page_count} atlas page(s): "
+          + ", ".join(f"{w}x{h}" for w, h in page_sizes))
+    return manifest
+
+
+class AssetCache:
+    """Process-wide cache of image Surfaces shared by every entity.
+
+    Entries are keyed by (path, size, flip) and evicted least recently used
+    once the pixel memory held goes over ``budget_bytes``. Cached Surfaces
+    are shared, so callers must copy() one before drawing on it. Images
+    found in the sprite atlas are cut from it instead of opened one by one.
+    """
+
+    MISSING = object()
+
+    def __init__(self, budget_bytes=64 * 1024 * 1024, atlas=None):
+        self.budget_bytes = budget_bytes
+        self.atlas = atlas
+        self.entries = OrderedDict()
+        self.bytes_held = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def load(self, path, size=None, flip=False):
+        """Return the converted (and scaled/flipped) image at path, or None if it does not exist"""
+        key = (path, tuple(size) if size else None, flip)
+        surf = self.lookup(key)
+        if surf is not None:
+            return None if surf is self.MISSING else surf
+
+        surf = self.atlas.frame(path) if self.atlas is not None else None
+        if surf is None:
+            if not os.path.exists(path):
+                self.store(key, self.MISSING)
+                return None
+            surf = pygame.image.load(path).convert_alpha()
+        if size:
+            surf = pygame.transform.scale(surf, key[1])
+        if flip:
+            surf = pygame.transform.flip(surf, True, False)
+        self.store(key, surf)
+        return surf
+
+    def get_or_create(self, key, factory):
+        """Return the Surface cached under key, building it with factory() on a miss"""
+        surf = self.lookup(key)
+        if surf is None:
+            surf = factory()
+            self.store(key, surf)
+        return surf
+
+    def lookup(self, key):
+        surf = self.entries.get(key)
+        if surf is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return surf
+
+    def store(self, key, surf):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes_held -= self.surface_bytes(old)
+        self.entries[key] = surf
+        self.bytes_held += self.surface_bytes(surf)
+        while self.bytes_held > self.budget_bytes and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes_held -= self.surface_bytes(evicted)
+            self.evictions += 1
+
+    def surface_bytes(self, surf):
+        if surf is self.MISSING:
+            return 0
+        return surf.get_width() * surf.get_height() * surf.get_bytesize()
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes_held = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self.entries), 'bytes': self.bytes_held}
+
+
+assets = AssetCache(atlas=SpriteAtlas(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'image', 'atlas.json')))
+
+
+class TextCache:
+    """Shared fonts and rendered text Surfaces.
+
+    Fonts are keyed by (face, size) and never rebuilt. Rendered strings are
+    keyed by (string, size, color, antialias, face) and kept least recently
+    used up to ``max_entries``; label() pins strings that never change so
+    they are rasterized once. Returned Surfaces are shared, so callers that
+    set_alpha() on one must do so before every blit.
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.fonts = {}
+        self.entries = OrderedDict()
+        self.labels = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def font(self, size, face=None):
+        key = (face, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = pygame.font.Font(face, size)
+        return font
+
+    def render(self, string, size, color, antialias=True, face=None):
+        """Rendered Surface for string, rasterized only on a cache miss"""
+        key = (string, size, tuple(color), antialias, face)
+        surf = self.labels.get(key)
+        if surf is not None:
+            self.hits += 1
+            return surf
+        surf = self.entries.get(key)
+        if surf is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        surf = self.font(size, face).render(string, antialias, color)
+        self.entries[key] = surf
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return surf
+
+    def label(self, string, size, color, antialias=True, face=None):
+        """Like render() but never evicted; for static strings"""
+        key = (string, size, tuple(color), antialias, face)
+        surf = self.labels.get(key)
+        if surf is None:
+            surf = self.labels[key] = self.font(size, face).render(string, antialias, color)
+        return surf
+
+    def clear(self):
+        self.entries.clear()
+        self.labels.clear()
+
+    def drop_fonts(self):
+        """Forget the fonts; they are invalid once pygame is quit"""
+        self.fonts.clear()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self.entries), 'labels': len(self.labels), 'fonts': len(self.fonts)}
+
+
+text_cache = TextCache()
+
+
+def translucent_panel(w, h, color=(0, 0, 0), alpha=180):
+    """Shared filled Surface with surface alpha, used behind text"""
+    def make():
+        surf = pygame.Surface((w, h))
+        surf.set_alpha(alpha)
+        surf.fill(color)
+        return surf
+    return assets.get_or_create(('panel', w, h, tuple(color), alpha), make)
+
+
+class SpriteVariants:
+    """Hit-flash, faded (dead) and mirrored copies of sprite frames.
+
+    Variants are built once per source Surface and kept as long as the
+    source is alive, so draw() only looks them up and blits. Entities call
+    prepare() with their frames when they load so nothing is built while
+    drawing.
+    """
+
+    FLASH = (255, 255, 255, 100)
+    FADED_ALPHA = 100
+
+    def __init__(self):
+        self.variants = weakref.WeakKeyDictionary()
+        self.built = 0
+
+    def get(self, surf, flash=False, faded=False, mirrored=False):
+        if not (flash or faded or mirrored):
+            return surf
+        table = self.variants.get(surf)
+        if table is None:
+            table = self.variants[surf] = {}
+        key = (flash, faded, mirrored)
+        variant = table.get(key)
+        if variant is None:
+            variant = table[key] = self.build(surf, flash, faded, mirrored)
+        return variant
+
+    def build(self, surf, flash, faded, mirrored):
+        img = pygame.transform.flip(surf, True, False) if mirrored else surf.copy()
+        if flash:
+            img.fill(self.FLASH, special_flags=pygame.BLEND_RGB_ADD)
+        if faded:
+            img.set_alpha(self.FADED_ALPHA)
+        self.built += 1
+        return img
+
+    def prepare(self, frames, faded=False, mirrored=False):
+        """Build every flash/faded/mirrored combination a sprite can draw"""
+        for surf in frames:
+            for mirror in ((False, True) if mirrored else (False,)):
+                for fade in ((False, True) if faded else (False,)):
+                    for flash in (False, True):
+                        self.get(surf, flash, fade, mirror)
+
+
+sprites = SpriteVariants()
+
+
+class ObjectPool:
+    """Free list of reusable objects of one class.
+
+    acquire() re-initialises a released object through its reset() (or
+    makes a new one when the free list is empty) and release() hands it
+    back. The high-water mark of objects in use at once is kept for
+    sizing the pool.
+    """
+
+    def __init__(self, cls, max_free=1024):
+        self.cls = cls
+        self.max_free = max_free
+        self.free = []
+        self.in_use = 0
+        self.high_water = 0
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, *args, **kwargs):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args, **kwargs)
+            self.reused += 1
+        else:
+            obj = self.cls(*args, **kwargs)
+            self.created += 1
+        self.in_use += 1
+        if self.in_use > self.high_water:
+            self.high_water = self.in_use
+        return obj
+
+    def release(self, obj):
+        self.in_use -= 1
+        if len(self.free) < self.max_free:
+            self.free.append(obj)
+
+    def release_all(self, objs):
+        for obj in objs:
+            self.release(obj)
+
+    def stats(self):
+        return {'in_use': self.in_use, 'high_water': self.high_water, 'free': len(self.free),
+                'created': self.created, 'reused': self.reused}
+
+
+def compact_live(items, pool):
+    """Drop dead objects from items in one in-place pass and release them to pool"""
+    kept = 0
+    for item in items:
+        if item.is_alive():
+            items[kept] = item
+            kept += 1
+        else:
+            pool.release(item)
+    del items[kept:]
+
+
 class Projectile:
+    __slots__ = ('x', 'y', 'damage', 'speed', 'is_enemy', 'active', 'projectile_type',
+                 'vel_x', 'vel_y', 'image', 'rect')
+
+    IMAGE_FILES = {'fire': 'fire_effect.png', 'water': 'water_effect.png', 'void': 'void_effect.png',
+                   'ice': 'ice_effect.png', 'lightning': 'lightning_effect.png',
+                   'holy': 'holy_effect.png'}
+
     def __init__(self, x, y, target_x, target_y, damage, is_enemy=False, projectile_type='default'):
+        self.image = None
+        self.rect = None
+        self.projectile_type = None
+        self.reset(x, y, target_x, target_y, damage, is_enemy, projectile_type)
+
+    def reset(self, x, y, target_x, target_y, damage, is_enemy=False, projectile_type='default'):
         self.x = x
         self.y = y
         self.damage = damage
         self.speed = 8
         self.is_enemy = is_enemy
         self.active = True
-        self.projectile_type = projectile_type
 
         dx = target_x - x
         dy = target_y - y
@@ -35,75 +477,187 @@ class Projectile:
             self.vel_x = 0
             self.vel_y = 0
 
-        # Load appropriate projectile image based on type
-        try:
-            base_dir = os.path.join(os.path.dirname(
-                os.path.abspath(__file__)), 'image')
-
-            if projectile_type == 'fire':
-                img_path = os.path.join(base_dir, 'fire_effect.png')
-            elif projectile_type == 'water':
-                img_path = os.path.join(base_dir, 'water_effect.png')
-            elif projectile_type == 'void':
-                img_path = os.path.join(base_dir, 'void_effect.png')
-            elif projectile_type == 'ice':
-                img_path = os.path.join(base_dir, 'ice_effect.png')
-            elif projectile_type == 'lightning':
-                img_path = os.path.join(base_dir, 'lightning_effect.png')
-            elif projectile_type == 'holy':
-                img_path = os.path.join(base_dir, 'holy_effect.png')
-            else:
-                img_path = os.path.join(base_dir, 'projectile.png')
+        # Load appropriate projectile image based on type; a reused
+        # projectile of the same type keeps the one it has
+        if self.image is None or projectile_type != self.projectile_type:
+            self.image = self.load_image(projectile_type)
+        self.projectile_type = projectile_type
 
-            if os.path.exists(img_path):
-                self.image = pygame.image.load(img_path).convert_alpha()
-                self.image = pygame.transform.scale(self.image, (20, 20))
-            else:
-                # Fallback with color coding
-                self.image = pygame.Surface((20, 20), pygame.SRCALPHA)
-                if projectile_type == 'fire':
-                    pygame.draw.circle(self.image, (255, 100, 0), (10, 10), 10)
-                elif projectile_type == 'water':
-                    pygame.draw.circle(self.image, (0, 150, 255), (10, 10), 10)
-                elif projectile_type == 'void':
-                    pygame.draw.circle(self.image, (150, 0, 200), (10, 10), 10)
-                elif projectile_type == 'ice':
-                    pygame.draw.circle(
-                        self.image, (150, 200, 255), (10, 10), 10)
-                elif projectile_type == 'lightning':
-                    pygame.draw.circle(
-                        self.image, (255, 255, 100), (10, 10), 10)
-                elif projectile_type == 'holy':
-                    pygame.draw.circle(
-                        self.image, (255, 255, 200), (10, 10), 10)
-                else:
-                    pygame.draw.circle(self.image, (255, 200, 0), (10, 10), 10)
+        if self.rect is None:
+            self.rect = self.image.get_rect(center=(x, y))
+        else:
+            self.rect.size = self.image.get_size()
+            self.rect.center = (x, y)
+
+    def load_image(self, projectile_type):
+        try:
+            img_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'image',
+                                    self.IMAGE_FILES.get(projectile_type, 'projectile.png'))
+            image = assets.load(img_path, (20, 20))
+            if image is None:
+                image = assets.get_or_create(
+                    ('projectile', projectile_type), lambda: self.make_fallback_image(projectile_type))
+            return image
         except Exception as e:
             print(f"Error loading projectile image: {e}")
-            self.image = pygame.Surface((20, 20), pygame.SRCALPHA)
-            pygame.draw.circle(self.image, (255, 200, 0), (10, 10), 10)
-
-        self.rect = self.image.get_rect(center=(x, y))
+            image = pygame.Surface((20, 20), pygame.SRCALPHA)
+            pygame.draw.circle(image, (255, 200, 0), (10, 10), 10)
+            return image
+
+    @staticmethod
+    def make_fallback_image(projectile_type):
+        """Fallback with color coding"""
+        image = pygame.Surface((20, 20), pygame.SRCALPHA)
+        if projectile_type == 'fire':
+            pygame.draw.circle(image, (255, 100, 0), (10, 10), 10)
+        elif projectile_type == 'water':
+            pygame.draw.circle(image, (0, 150, 255), (10, 10), 10)
+        elif projectile_type == 'void':
+            pygame.draw.circle(image, (150, 0, 200), (10, 10), 10)
+        elif projectile_type == 'ice':
+            pygame.draw.circle(image, (150, 200, 255), (10, 10), 10)
+        elif projectile_type == 'lightning':
+            pygame.draw.circle(image, (255, 255, 100), (10, 10), 10)
+        elif projectile_type == 'holy':
+            pygame.draw.circle(image, (255, 255, 200), (10, 10), 10)
+        else:
+            pygame.draw.circle(image, (255, 200, 0), (10, 10), 10)
+        return image
 
     def update(self):
         self.x += self.vel_x
         self.y += self.vel_y
         self.rect.center = (self.x, self.y)
 
-    def check_collision(self, collision_rects):
+    def check_collision(self, collision):
         """Check if projectile hits a collision tile"""
-        for rect in collision_rects:
-            if self.rect.colliderect(rect):
-                return True
-        return False
+        return collision.is_blocked(self.rect)
 
-    def draw(self, surface, camera_x, camera_y):
-        surface.blit(self.image, (self.x - camera_x -
-                     10, self.y - camera_y - 10))
+    def is_alive(self):
+        return self.active
+
+    def render(self, queue, camera_x, camera_y):
+        queue.submit(self.image, (self.x - camera_x - 10, self.y - camera_y - 10), self.y + 10)
+
+
+class ProjectilePool:
+    """Struct-of-arrays store for live projectiles, updated with NumPy.
+
+    Positions, velocities, damage, owner flag and type id live in
+    preallocated arrays (grown by doubling), so a frame's integration,
+    bounds check and compaction are a handful of vectorized operations.
+    Order is kept stable, so hits resolve in the same order as a list of
+    Projectile objects would. Damage is kept as the Python number it was
+    given so entity health ends up exactly as the object path leaves it.
+    """
+
+    SIZE = 20
+
+    def __init__(self, capacity=256):
+        self.count = 0
+        self.type_ids = {}
+        self.images = []
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        old = getattr(self, 'x', None)
+        fields = {'x': np.float64, 'y': np.float64, 'vel_x': np.float64, 'vel_y': np.float64,
+                  'damage': object, 'is_enemy': np.bool_, 'active': np.bool_, 'type_id': np.int16}
+        for name, dtype in fields.items():
+            array = np.zeros(capacity, dtype=dtype)
+            if old is not None:
+                array[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def __len__(self):
+        return self.count
+
+    def add(self, projectile):
+        """Copy a Projectile into the pool"""
+        if self.count == self.capacity:
+            self.allocate(self.capacity * 2)
+        type_id = self.type_ids.get(projectile.projectile_type)
+        if type_id is None:
+            type_id = self.type_ids[projectile.projectile_type] = len(self.images)
+            self.images.append(projectile.image)
+        i = self.count
+        self.x[i] = projectile.x
+        self.y[i] = projectile.y
+        self.vel_x[i] = projectile.vel_x
+        self.vel_y[i] = projectile.vel_y
+        self.damage[i] = projectile.damage
+        self.is_enemy[i] = projectile.is_enemy
+        self.active[i] = True
+        self.type_id[i] = type_id
+        self.count += 1
+
+    def integrate(self):
+        n = self.count
+        self.x[:n] += self.vel_x[:n]
+        self.y[:n] += self.vel_y[:n]
+
+    def rect_topleft(self):
+        """Top-left corners of the projectile rects, rounded the way Rect.center rounds"""
+        n = self.count
+        half = self.SIZE // 2
+        left = np.trunc(self.x[:n] + np.copysign(0.5, self.x[:n])) - half
+        top = np.trunc(self.y[:n] + np.copysign(0.5, self.y[:n])) - half
+        return left, top
+
+    def overlaps(self, left, top, rect):
+        """Mask of projectiles whose rect collides with rect"""
+        return (left < rect.right) & (left + self.SIZE > rect.left) & \
+            (top < rect.bottom) & (top + self.SIZE > rect.top)
+
+    def compact(self, map_w, map_h):
+        """Drop inactive and out-of-bounds projectiles, keeping the order of the rest"""
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        keep = self.active[:n] & (x >= 0) & (x <= map_w) & (y >= 0) & (y <= map_h)
+        kept = int(np.count_nonzero(keep))
+        if kept != n:
+            for name in ('x', 'y', 'vel_x', 'vel_y', 'damage', 'is_enemy', 'active', 'type_id'):
+                array = getattr(self, name)
+                array[:kept] = array[:n][keep]
+            self.count = kept
+
+    def clear(self):
+        self.count = 0
+
+    def render(self, queue, camera_x, camera_y, lag=0.0):
+        """Submit every on-screen projectile; lag steps them back that fraction of a tick"""
+        n = self.count
+        if not n:
+            return
+        half = self.SIZE // 2
+        xs = self.x[:n] - self.vel_x[:n] * lag - camera_x - half
+        ys = self.y[:n] - self.vel_y[:n] * lag - camera_y - half
+        view = queue.view
+        on_screen = (xs > view.left - self.SIZE) & (xs < view.right) & \
+            (ys > view.top - self.SIZE) & (ys < view.bottom)
+        queue.count_culled(n - int(np.count_nonzero(on_screen)))
+        type_ids = self.type_id[:n]
+        for type_id, image in enumerate(self.images):
+            mask = on_screen & (type_ids == type_id)
+            if mask.any():
+                for x, y, depth in zip(xs[mask].tolist(), ys[mask].tolist(),
+                                       (ys[mask] + camera_y + self.SIZE).tolist()):
+                    queue.submit(image, (x, y), depth)
 
 
 class FloatingText:
+    __slots__ = ('x', 'y', 'text', 'color', 'timer', 'vel_y', 'alpha', 'surface')
+
     def __init__(self, x, y, text, color=(255, 0, 0)):
+        self.text = None
+        self.color = None
+        self.reset(x, y, text, color)
+
+    def reset(self, x, y, text, color=(255, 0, 0)):
+        if text != self.text or color != self.color:
+            self.surface = None
         self.x = x
         self.y = y
         self.text = text
@@ -117,23 +671,33 @@ class FloatingText:
         self.timer -= 1
         self.alpha = int((self.timer / 60) * 255)
 
-    def draw(self, surface, camera_x, camera_y):
+    def render(self, queue, camera_x, camera_y):
         if self.timer > 0:
-            font = pygame.font.Font(None, 36)
-            text_surf = font.render(self.text, True, self.color)
-            text_surf.set_alpha(self.alpha)
-            surface.blit(text_surf, (self.x - camera_x, self.y - camera_y))
+            # Texts are blitted in one batch, so each fades its own copy of
+            # the shared cached Surface
+            if self.surface is None:
+                self.surface = text_cache.render(self.text, 36, self.color).copy()
+            self.surface.set_alpha(self.alpha)
+            queue.submit(self.surface, (self.x - camera_x, self.y - camera_y), queue.OVERLAY)
 
     def is_alive(self):
         return self.timer > 0
 
 
+FloatingText.pool = ObjectPool(FloatingText)
+Projectile.pool = ObjectPool(Projectile)
+
+
+def pool_stats():
+    return {'floating_text': FloatingText.pool.stats(), 'projectile': Projectile.pool.stats()}
+
+
 class DialogueSystem:
     def __init__(self):
         self.active = False
         self.dialogues = []
         self.current_index = 0
-        self.font = pygame.font.Font(None, 28)
+        self.font = text_cache.font(28)
 
     def start_dialogue(self, dialogues):
         self.dialogues = dialogues
@@ -155,10 +719,8 @@ class DialogueSystem:
         box_y = screen_height - box_height - 10
         box_rect = pygame.Rect(10, box_y, screen_width - 20, box_height)
 
-        bg_surf = pygame.Surface((box_rect.width, box_rect.height))
-        bg_surf.set_alpha(200)
-        bg_surf.fill((20, 20, 40))
-        surface.blit(bg_surf, box_rect.topleft)
+        surface.blit(translucent_panel(box_rect.width, box_rect.height, (20, 20, 40), 200),
+                     box_rect.topleft)
 
         pygame.draw.rect(surface, (255, 255, 255), box_rect, 3)
 
@@ -182,13 +744,11 @@ class DialogueSystem:
 
             y_offset = box_y + 20
             for line in lines[:3]:
-                text_surf = self.font.render(
-                    line.strip(), True, (255, 255, 255))
+                text_surf = text_cache.render(line.strip(), 28, (255, 255, 255))
                 surface.blit(text_surf, (box_rect.x + 20, y_offset))
                 y_offset += 30
 
-        prompt = self.font.render(
-            "Press SPACE to continue...", True, (200, 200, 200))
+        prompt = text_cache.label("Press SPACE to continue...", 28, (200, 200, 200))
         surface.blit(prompt, (box_rect.x + 20, box_rect.bottom - 35))
 
 
@@ -235,24 +795,10 @@ class NPC:
         try:
             img_path = os.path.join(os.path.dirname(
                 os.path.abspath(__file__)), 'image', f'{self.npc_name}.png')
-            if os.path.exists(img_path):
-                self.image = pygame.image.load(img_path).convert_alpha()
-                self.image = pygame.transform.scale(
-                    self.image, (self.render_w, self.render_h))
-            else:
-                # Fallback placeholder
-                self.image = pygame.Surface(
-                    (self.render_w, self.render_h), pygame.SRCALPHA)
-                if 'barman' in self.npc_name.lower():
-                    pygame.draw.rect(self.image, (139, 69, 19),
-                                     (10, 10, self.render_w-20, self.render_h-20))
-                    pygame.draw.circle(
-                        self.image, (255, 220, 177), (self.render_w//2, self.render_h//3), 15)
-                else:
-                    pygame.draw.rect(self.image, (100, 100, 200),
-                                     (10, 10, self.render_w-20, self.render_h-20))
-                    pygame.draw.circle(
-                        self.image, (255, 220, 177), (self.render_w//2, self.render_h//3), 15)
+            self.image = assets.load(img_path, (self.render_w, self.render_h))
+            if self.image is None:
+                self.image = assets.get_or_create(
+                    ('npc', self.npc_name, self.render_w, self.render_h), self.make_placeholder)
         except Exception as e:
             print(f"Error loading NPC image: {e}")
             self.image = pygame.Surface(
@@ -260,36 +806,42 @@ class NPC:
             pygame.draw.rect(self.image, (100, 100, 200),
                              (10, 10, self.render_w-20, self.render_h-20))
 
+    def make_placeholder(self):
+        image = pygame.Surface((self.render_w, self.render_h), pygame.SRCALPHA)
+        if 'barman' in self.npc_name.lower():
+            pygame.draw.rect(image, (139, 69, 19),
+                             (10, 10, self.render_w-20, self.render_h-20))
+        else:
+            pygame.draw.rect(image, (100, 100, 200),
+                             (10, 10, self.render_w-20, self.render_h-20))
+        pygame.draw.circle(
+            image, (255, 220, 177), (self.render_w//2, self.render_h//3), 15)
+        return image
+
     def can_interact(self, player):
         """Check if player is close enough to interact"""
         distance = math.sqrt((self.pixel_x - player.pixel_x)
                              ** 2 + (self.pixel_y - player.pixel_y)**2)
         return distance <= self.interaction_range
 
-    def draw(self, surface, camera_x, camera_y):
-        surface.blit(self.image, (self.pixel_x -
-                     camera_x, self.pixel_y - camera_y))
+    def render(self, queue, camera_x, camera_y):
+        depth = self.pixel_y + self.render_h
+        queue.submit(self.image, (self.pixel_x - camera_x, self.pixel_y - camera_y), depth)
 
-        # Draw name tag
-        font = pygame.font.Font(None, 20)
-        name_surf = font.render(self.npc_name.upper(), True, (255, 255, 255))
+        # Name tag over a translucent background, at the NPC's depth
+        name_surf = text_cache.label(self.npc_name.upper(), 20, (255, 255, 255))
         name_x = self.pixel_x - camera_x + \
             (self.render_w - name_surf.get_width()) // 2
         name_y = self.pixel_y - camera_y - 15
-
-        # Draw background for name
-        bg_rect = pygame.Rect(
-            name_x - 5, name_y - 2, name_surf.get_width() + 10, name_surf.get_height() + 4)
-        bg_surf = pygame.Surface((bg_rect.width, bg_rect.height))
-        bg_surf.set_alpha(180)
-        bg_surf.fill((0, 0, 0))
-        surface.blit(bg_surf, bg_rect.topleft)
-
-        surface.blit(name_surf, (name_x, name_y))
+        queue.submit(translucent_panel(name_surf.get_width() + 10, name_surf.get_height() + 4),
+                     (name_x - 5, name_y - 2), depth)
+        queue.submit(name_surf, (name_x, name_y), depth)
 
 
 class Player:
-    def __init__(self, x, y, tile_w, tile_h):
+    def __init__(self, x, y, tile_w, tile_h, rng=random):
+        # Crit rolls come from rng (a Game's seeded random.Random)
+        self.rng = rng
         self.tile_w = tile_w
         self.tile_h = tile_h
         self.size_multiplier = 1.0
@@ -343,7 +895,7 @@ class Player:
         self.total_xp += amount
 
         if game:
-            game.floating_texts.append(FloatingText(
+            game.floating_texts.append(FloatingText.pool.acquire(
                 self.pixel_x + self.tile_w // 2,
                 self.pixel_y - 20,
                 f"+{amount} XP",
@@ -385,7 +937,7 @@ class Player:
         if game:
             game.message = f"LEVEL UP! Now Level {self.level}"
             game.message_timer = 120
-            game.floating_texts.append(FloatingText(
+            game.floating_texts.append(FloatingText.pool.acquire(
                 self.pixel_x + self.tile_w // 2,
                 self.pixel_y - 40,
                 f"LEVEL {self.level}!",
@@ -414,25 +966,33 @@ class Player:
                         path) if f.lower().endswith(('.png', '.jpg', '.bmp'))])
                     for fn in files:
                         try:
-                            img = pygame.image.load(
-                                os.path.join(path, fn)).convert_alpha()
-                            img = pygame.transform.scale(img, sizes)
-                            frames.append(img)
+                            img = assets.load(os.path.join(path, fn), sizes)
+                            if img is not None:
+                                frames.append(img)
                         except Exception:
                             pass
             except Exception:
                 pass
             if not frames:
-                placeholder = pygame.Surface(sizes, pygame.SRCALPHA)
-                pygame.draw.rect(placeholder, (100, 150, 255),
-                                 (0, 0, sizes[0], sizes[1]))
-                frames = [placeholder]
+                frames = [self.placeholder()]
             return frames
 
         self.animations['idle'] = load_folder('idle')
         self.animations['walking'] = load_folder('walking')
         self.animations['attacking'] = load_folder('attacking')
         self.animations['dying'] = load_folder('dying')
+        for frames in self.animations.values():
+            sprites.prepare(frames, mirrored=True)
+
+    def placeholder(self):
+        sizes = (max(1, self.render_w), max(1, self.render_h))
+
+        def make_placeholder():
+            placeholder = pygame.Surface(sizes, pygame.SRCALPHA)
+            pygame.draw.rect(placeholder, (100, 150, 255),
+                             (0, 0, sizes[0], sizes[1]))
+            return placeholder
+        return assets.get_or_create(('player', sizes), make_placeholder)
 
     def set_tile_size(self, tile_w, tile_h):
         self.tile_w = tile_w
@@ -446,13 +1006,13 @@ class Player:
             self.stamina -= self.attack_cost
             self.attack_cooldown = 30
 
-            is_crit = random.random() < self.crit_chance
+            is_crit = self.rng.random() < self.crit_chance
             damage = self.attack_damage * self.crit_multiplier if is_crit else self.attack_damage
 
             center_x = self.pixel_x + self.tile_w // 2
             center_y = self.pixel_y + self.tile_h // 2
 
-            return Projectile(center_x, center_y, target_x, target_y, damage, is_enemy=False), is_crit
+            return Projectile.pool.acquire(center_x, center_y, target_x, target_y, damage, is_enemy=False), is_crit
         return None, False
 
     def attack(self, enemies):
@@ -469,7 +1029,7 @@ class Player:
                     distance = ((self.pixel_x - enemy.pixel_x) **
                                 2 + (self.pixel_y - enemy.pixel_y)**2)**0.5
                     if distance <= self.attack_range:
-                        is_crit = random.random() < self.crit_chance
+                        is_crit = self.rng.random() < self.crit_chance
                         damage = self.attack_damage * self.crit_multiplier if is_crit else self.attack_damage
                         enemy.take_damage(damage, is_crit)
                         hit_any = True
@@ -504,7 +1064,7 @@ class Player:
                 if self.state == State.ATTACKING:
                     self.state = State.IDLE
 
-    def handle_input(self, keys, collision_rects, map_width, map_height):
+    def handle_input(self, keys, collision, map_width, map_height):
         moving = False
         if self.state != State.DEAD:
             current_speed = self.run_speed if (
@@ -536,7 +1096,7 @@ class Player:
 
             new_rect = pygame.Rect(
                 self.pixel_x+dx, self.pixel_y+dy, self.tile_w, self.tile_h)
-            if not any(new_rect.colliderect(r) for r in collision_rects):
+            if not collision.is_blocked(new_rect):
                 if 0 <= new_rect.x <= map_width*self.tile_w - self.tile_w and 0 <= new_rect.y <= map_height*self.tile_h - self.tile_h:
                     self.pixel_x += dx
                     self.pixel_y += dy
@@ -572,34 +1132,25 @@ class Player:
             self.frame_index = 0
             self.animation_counter = 0.0
 
-    def draw(self, surface, camera_x, camera_y):
+    def render(self, queue, camera_x, camera_y):
         anim_key = getattr(self, 'current_anim_key', 'idle')
         frames = self.animations.get(anim_key, [])
         if not frames:
-            img = pygame.Surface(
-                (self.render_w, self.render_h), pygame.SRCALPHA)
-            pygame.draw.rect(img, (100, 150, 255),
-                             (0, 0, self.render_w, self.render_h))
+            img = self.placeholder()
         else:
             idx = max(0, min(self.frame_index, len(frames)-1))
             img = frames[idx]
 
-        if self.current_direction == 'left':
-            img = pygame.transform.flip(img, True, False)
-
-        if self.hit_flash > 0:
-            flash_img = img.copy()
-            flash_img.fill((255, 255, 255, 100),
-                           special_flags=pygame.BLEND_RGB_ADD)
-            surface.blit(flash_img, (self.pixel_x -
-                         camera_x, self.pixel_y - camera_y))
-        else:
-            surface.blit(img, (self.pixel_x - camera_x,
-                         self.pixel_y - camera_y))
+        img = sprites.get(img, flash=self.hit_flash > 0,
+                          mirrored=self.current_direction == 'left')
+        queue.submit(img, (self.pixel_x - camera_x, self.pixel_y - camera_y),
+                     self.pixel_y + self.render_h)
 
 
 class Slime:
-    def __init__(self, x, y, tile_w, tile_h, slime_type='red_slime'):
+    def __init__(self, x, y, tile_w, tile_h, slime_type='red_slime', rng=random):
+        # Wander rolls come from rng (a Game's seeded random.Random)
+        self.rng = rng
         self.tile_w = tile_w
         self.tile_h = tile_h
         self.size_multiplier = 2.0
@@ -636,6 +1187,8 @@ class Slime:
         self.animation_counter = 0.0
         self.animation_speed = 0.15
 
+        self.hitbox = pygame.Rect(x, y, tile_w, tile_h)
+
         self.load_animations()
 
     def load_animations(self):
@@ -651,10 +1204,8 @@ class Slime:
                     path = os.path.join(base, f'{self.slime_type}_idle.png')
                 else:
                     path = os.path.join(base, f'{self.slime_type}_idle{i}.png')
-                if os.path.exists(path):
-                    img = pygame.image.load(path).convert_alpha()
-                    img = pygame.transform.scale(
-                        img, (self.render_w, self.render_h))
+                img = assets.load(path, (self.render_w, self.render_h))
+                if img is not None:
                     self.idle_frames.append(img)
             except Exception as e:
                 print(f"Could not load {path}: {e}")
@@ -667,29 +1218,35 @@ class Slime:
                 else:
                     path = os.path.join(
                         base, f'{self.slime_type}_attack{i}.png')
-                if os.path.exists(path):
-                    img = pygame.image.load(path).convert_alpha()
-                    img = pygame.transform.scale(
-                        img, (self.render_w, self.render_h))
+                img = assets.load(path, (self.render_w, self.render_h))
+                if img is not None:
                     self.attack_frames.append(img)
             except Exception as e:
                 print(f"Could not load {path}: {e}")
 
         # Fallback if no frames loaded
         if not self.idle_frames:
-            placeholder = pygame.Surface(
-                (self.render_w, self.render_h), pygame.SRCALPHA)
-            if 'blue' in self.slime_type:
-                pygame.draw.circle(placeholder, (100, 100, 255),
-                                   (self.render_w//2, self.render_h//2), self.render_w//3)
-            elif 'yellow' in self.slime_type:
-                pygame.draw.circle(placeholder, (255, 255, 100),
-                                   (self.render_w//2, self.render_h//2), self.render_w//3)
-            else:
-                pygame.draw.circle(placeholder, (255, 100, 100),
-                                   (self.render_w//2, self.render_h//2), self.render_w//3)
+            placeholder = assets.get_or_create(
+                ('slime', self.slime_type, self.render_w, self.render_h), self.make_placeholder)
             self.idle_frames = [placeholder]
             self.attack_frames = [placeholder]
+        sprites.prepare(self.idle_frames + self.attack_frames, faded=True)
+
+    def update_hitbox(self):
+        self.hitbox.topleft = (int(self.pixel_x), int(self.pixel_y))
+
+    def make_placeholder(self):
+        placeholder = pygame.Surface(
+            (self.render_w, self.render_h), pygame.SRCALPHA)
+        if 'blue' in self.slime_type:
+            color = (100, 100, 255)
+        elif 'yellow' in self.slime_type:
+            color = (255, 255, 100)
+        else:
+            color = (255, 100, 100)
+        pygame.draw.circle(placeholder, color,
+                           (self.render_w//2, self.render_h//2), self.render_w//3)
+        return placeholder
 
     def take_damage(self, damage, is_crit=False):
         if self.state != State.DEAD:
@@ -706,7 +1263,7 @@ class Slime:
                 self.state = State.HURT
             return False, 0
 
-    def update(self, player, collision_rects, map_width, map_height, game=None):
+    def update(self, player, collision, map_width, map_height, game=None):
         if self.state == State.DEAD:
             return
 
@@ -730,7 +1287,7 @@ class Slime:
                 dy = (dy / length) * self.speed
                 new_rect = pygame.Rect(
                     self.pixel_x + dx, self.pixel_y + dy, self.tile_w, self.tile_h)
-                if not any(new_rect.colliderect(r) for r in collision_rects):
+                if not collision.is_blocked(new_rect):
                     self.pixel_x += dx
                     self.pixel_y += dy
 
@@ -742,20 +1299,22 @@ class Slime:
                 self.state = State.ATTACKING
         else:
             if self.wander_timer <= 0:
-                self.wander_timer = random.randint(60, 180)
+                self.wander_timer = self.rng.randint(60, 180)
                 self.wander_direction = [
-                    random.uniform(-1, 1), random.uniform(-1, 1)]
+                    self.rng.uniform(-1, 1), self.rng.uniform(-1, 1)]
             else:
                 self.wander_timer -= 1
                 dx = self.wander_direction[0] * self.speed * 0.5
                 dy = self.wander_direction[1] * self.speed * 0.5
                 new_rect = pygame.Rect(
                     self.pixel_x + dx, self.pixel_y + dy, self.tile_w, self.tile_h)
-                if not any(new_rect.colliderect(r) for r in collision_rects):
+                if not collision.is_blocked(new_rect):
                     if 0 <= new_rect.x <= map_width*self.tile_w and 0 <= new_rect.y <= map_height*self.tile_h:
                         self.pixel_x += dx
                         self.pixel_y += dy
 
+        self.update_hitbox()
+
         # Update animation
         frames = self.attack_frames if self.state == State.ATTACKING else self.idle_frames
         if frames:
@@ -770,31 +1329,172 @@ class Slime:
                 else:
                     self.frame_index = (self.frame_index + 1) % len(frames)
 
-    def draw(self, surface, camera_x, camera_y):
+    def render(self, queue, camera_x, camera_y):
         frames = self.attack_frames if self.state == State.ATTACKING else self.idle_frames
         if frames:
             idx = max(0, min(self.frame_index, len(frames)-1))
-            img = frames[idx].copy()
-        else:
-            img = pygame.Surface(
-                (self.render_w, self.render_h), pygame.SRCALPHA)
-
-        if self.hit_flash > 0:
-            img.fill((255, 255, 255, 100), special_flags=pygame.BLEND_RGB_ADD)
-        if self.state == State.DEAD:
-            img.set_alpha(100)
-        surface.blit(img, (self.pixel_x - camera_x, self.pixel_y - camera_y))
+            img = sprites.get(frames[idx], flash=self.hit_flash > 0,
+                              faded=self.state == State.DEAD)
+            queue.submit(img, (self.pixel_x - camera_x, self.pixel_y - camera_y),
+                         self.pixel_y + self.render_h)
 
         if self.state != State.DEAD:
-            bar_width = self.render_w
-            bar_height = 5
-            bar_x = self.pixel_x - camera_x
-            bar_y = self.pixel_y - camera_y - 10
-            pygame.draw.rect(surface, (100, 0, 0),
-                             (bar_x, bar_y, bar_width, bar_height))
-            health_width = int((self.health / self.max_health) * bar_width)
-            pygame.draw.rect(surface, (0, 255, 0),
-                             (bar_x, bar_y, health_width, bar_height))
+            queue.submit_bar(self.pixel_x - camera_x, self.pixel_y - camera_y - 10, self.render_w, 5,
+                             self.health / self.max_health, (0, 255, 0), (100, 0, 0),
+                             self.pixel_y + self.render_h)
+
+
+class SlimeSwarm:
+    """Batched update path for large slime hordes.
+
+    Position, speed, cooldown, wander timer/direction, ranges and animation
+    counters live in NumPy arrays, and step() makes the chase, wander and
+    attack decisions for every slime in one pass, resolving movement
+    against the collision grid. The Slime objects are still used for
+    drawing and damage: their state and hit flash are read back in before
+    each step and everything else is written out after it. Wander rolls
+    come from the swarm's own generator, so a swarm run does not replay
+    the per-slime random module sequence, and every chase decision sees
+    the player as alive at the start of the step.
+    """
+
+    STATE_CODES = {State.IDLE: 0, State.ATTACKING: 1, State.HURT: 2, State.DEAD: 3}
+    CODE_STATES = {code: state for state, code in STATE_CODES.items()}
+
+    def __init__(self, slimes, seed=None):
+        self.slimes = list(slimes)
+        self.rng = np.random.default_rng(seed)
+        s = self.slimes
+
+        def column(attr, dtype=np.float64):
+            return np.array([getattr(slime, attr) for slime in s], dtype=dtype)
+
+        self.x = column('pixel_x')
+        self.y = column('pixel_y')
+        self.speed = column('speed')
+        self.attack_cooldown = column('attack_cooldown', np.int64)
+        self.attack_damage = column('attack_damage')
+        self.attack_range = column('attack_range')
+        self.detection_range = column('detection_range')
+        self.wander_timer = column('wander_timer', np.int64)
+        self.wander_dir = np.array([slime.wander_direction for slime in s],
+                                   dtype=np.float64).reshape(len(s), 2)
+        self.frame_index = column('frame_index', np.int64)
+        self.animation_counter = column('animation_counter')
+        self.animation_speed = column('animation_speed')
+        self.render_w = column('render_w')
+        self.render_h = column('render_h')
+        self.idle_len = np.array([len(slime.idle_frames) for slime in s], dtype=np.int64)
+        self.attack_len = np.array([len(slime.attack_frames) for slime in s], dtype=np.int64)
+        self.tile_w = s[0].tile_w if s else 0
+        self.tile_h = s[0].tile_h if s else 0
+
+    def __len__(self):
+        return len(self.slimes)
+
+    def step(self, player, collision, map_width, map_height, game=None, active=None):
+        """Advance every live slime one tick; with an active mask only those slimes"""
+        if not self.slimes:
+            return
+        codes = self.STATE_CODES
+        state = np.array([codes[slime.state] for slime in self.slimes], dtype=np.int64)
+        hit_flash = np.array([slime.hit_flash for slime in self.slimes], dtype=np.int64)
+        alive = state != codes[State.DEAD]
+        if active is not None:
+            alive &= active
+
+        self.attack_cooldown[alive & (self.attack_cooldown > 0)] -= 1
+        hit_flash[alive & (hit_flash > 0)] -= 1
+        state[alive & (state == codes[State.HURT]) & (hit_flash == 0)] = codes[State.IDLE]
+
+        dx = player.pixel_x - self.x
+        dy = player.pixel_y - self.y
+        distance = np.sqrt(dx * dx + dy * dy)
+        player_alive = player.state != State.DEAD
+        chase = alive & (distance <= self.detection_range) & player_alive
+        wander = alive & ~chase
+
+        # Chase: step towards the player unless the new rect is blocked
+        moving = chase & (distance > 0)
+        safe = np.where(distance > 0, distance, 1.0)
+        step_x = np.where(moving, dx / safe * self.speed, 0.0)
+        step_y = np.where(moving, dy / safe * self.speed, 0.0)
+
+        # Wander: re-roll an exhausted timer, otherwise drift and count down
+        reroll = wander & (self.wander_timer <= 0)
+        drift = wander & ~reroll
+        rerolled = int(np.count_nonzero(reroll))
+        if rerolled:
+            self.wander_timer[reroll] = self.rng.integers(60, 181, rerolled)
+            self.wander_dir[reroll] = self.rng.uniform(-1, 1, (rerolled, 2))
+        self.wander_timer[drift] -= 1
+        step_x = np.where(drift, self.wander_dir[:, 0] * self.speed * 0.5, step_x)
+        step_y = np.where(drift, self.wander_dir[:, 1] * self.speed * 0.5, step_y)
+
+        candidates = np.flatnonzero(moving | drift)
+        if len(candidates):
+            new_x = self.x[candidates] + step_x[candidates]
+            new_y = self.y[candidates] + step_y[candidates]
+            left = np.trunc(new_x)
+            top = np.trunc(new_y)
+            ok = ~collision.blocked_mask(left, top, self.tile_w, self.tile_h)
+            bounded = drift[candidates]
+            ok &= ~bounded | ((left >= 0) & (left <= map_width * self.tile_w) &
+                              (top >= 0) & (top <= map_height * self.tile_h))
+            self.x[candidates[ok]] = new_x[ok]
+            self.y[candidates[ok]] = new_y[ok]
+
+        attackers = np.flatnonzero(chase & (distance <= self.attack_range) &
+                                   (self.attack_cooldown == 0))
+        for i in attackers:
+            if player.state == State.DEAD:
+                break
+            player.take_damage(self.attack_damage[i].item())
+            if game:
+                game.play_sound('taking_damage')
+            self.attack_cooldown[i] = 60
+            state[i] = codes[State.ATTACKING]
+
+        # Animation
+        attacking = state == codes[State.ATTACKING]
+        has_frames = alive & (np.where(attacking, self.attack_len, self.idle_len) > 0)
+        self.animation_counter[has_frames] += self.animation_speed[has_frames]
+        advance = has_frames & (self.animation_counter >= 1.0)
+        self.animation_counter[advance] = 0.0
+        attack_advance = advance & attacking
+        self.frame_index[attack_advance] += 1
+        finished = attack_advance & (self.frame_index >= self.attack_len)
+        self.frame_index[finished] = 0
+        state[finished] = codes[State.IDLE]
+        idle_advance = advance & ~attacking
+        self.frame_index[idle_advance] = (self.frame_index[idle_advance] + 1) % \
+            np.maximum(self.idle_len[idle_advance], 1)
+
+        self.write_back(np.flatnonzero(alive), state, hit_flash)
+
+    def write_back(self, indices, state, hit_flash):
+        states = self.CODE_STATES
+        xs = self.x.tolist()
+        ys = self.y.tolist()
+        cooldowns = self.attack_cooldown.tolist()
+        timers = self.wander_timer.tolist()
+        dirs = self.wander_dir.tolist()
+        frames = self.frame_index.tolist()
+        counters = self.animation_counter.tolist()
+        codes = state.tolist()
+        flashes = hit_flash.tolist()
+        for i in indices.tolist():
+            slime = self.slimes[i]
+            slime.pixel_x = xs[i]
+            slime.pixel_y = ys[i]
+            slime.attack_cooldown = cooldowns[i]
+            slime.hit_flash = flashes[i]
+            slime.state = states[codes[i]]
+            slime.wander_timer = timers[i]
+            slime.wander_direction = dirs[i]
+            slime.frame_index = frames[i]
+            slime.animation_counter = counters[i]
+            slime.hitbox.topleft = (int(xs[i]), int(ys[i]))
 
 
 class Tower:
@@ -852,45 +1552,21 @@ class Tower:
         self.hit_flash = 0
         self.shoot_cooldown = 0
 
+        self.hitbox = pygame.Rect(x, y, self.render_w, self.render_h)
+
         self.load_image()
+        sprites.prepare([self.image], faded=True)
 
     def load_image(self):
         try:
             img_path = os.path.join(os.path.dirname(os.path.abspath(
                 __file__)), 'image', f'tower_{self.tower_type}.png')
-            if os.path.exists(img_path):
-                self.image = pygame.image.load(img_path).convert_alpha()
-                self.image = pygame.transform.scale(
-                    self.image, (self.render_w, self.render_h))
+            self.image = assets.load(img_path, (self.render_w, self.render_h))
+            if self.image is not None:
                 print(f"Loaded tower image: tower_{self.tower_type}.png")
             else:
-                # Fallback with color coding
-                self.image = pygame.Surface(
-                    (self.render_w, self.render_h), pygame.SRCALPHA)
-                if self.tower_type == 'fire':
-                    color = (255, 100, 0)
-                elif self.tower_type == 'water':
-                    color = (0, 100, 255)
-                elif self.tower_type == 'void':
-                    color = (100, 0, 150)
-                elif self.tower_type == 'ice':
-                    color = (150, 200, 255)
-                elif self.tower_type == 'lightning':
-                    color = (255, 255, 100)
-                elif self.tower_type == 'holy':
-                    color = (255, 255, 200)
-                else:
-                    color = (150, 150, 150)
-
-                # Draw tower base
-                pygame.draw.rect(
-                    self.image, color, (10, self.render_h//2, self.render_w-20, self.render_h//2-10))
-                # Draw tower top (cannon/turret)
-                pygame.draw.circle(self.image, (200, 200, 200),
-                                   (self.render_w//2, self.render_h//3), 15)
-                # Draw tower detail
-                pygame.draw.rect(self.image, (80, 80, 80),
-                                 (self.render_w//2-5, self.render_h//3-20, 10, 20))
+                self.image = assets.get_or_create(
+                    ('tower', self.tower_type, self.render_w, self.render_h), self.make_fallback_image)
                 print(f"Created fallback tower graphics for {self.tower_type}")
         except Exception as e:
             print(f"Error loading tower image: {e}")
@@ -899,6 +1575,36 @@ class Tower:
             pygame.draw.rect(self.image, (150, 150, 150),
                              (10, 10, self.render_w-20, self.render_h-20))
 
+    def make_fallback_image(self):
+        # Fallback with color coding
+        image = pygame.Surface(
+            (self.render_w, self.render_h), pygame.SRCALPHA)
+        if self.tower_type == 'fire':
+            color = (255, 100, 0)
+        elif self.tower_type == 'water':
+            color = (0, 100, 255)
+        elif self.tower_type == 'void':
+            color = (100, 0, 150)
+        elif self.tower_type == 'ice':
+            color = (150, 200, 255)
+        elif self.tower_type == 'lightning':
+            color = (255, 255, 100)
+        elif self.tower_type == 'holy':
+            color = (255, 255, 200)
+        else:
+            color = (150, 150, 150)
+
+        # Draw tower base
+        pygame.draw.rect(
+            image, color, (10, self.render_h//2, self.render_w-20, self.render_h//2-10))
+        # Draw tower top (cannon/turret)
+        pygame.draw.circle(image, (200, 200, 200),
+                           (self.render_w//2, self.render_h//3), 15)
+        # Draw tower detail
+        pygame.draw.rect(image, (80, 80, 80),
+                         (self.render_w//2-5, self.render_h//3-20, 10, 20))
+        return image
+
     def take_damage(self, damage, is_crit=False):
         if self.state != State.DEAD:
             self.health -= damage
@@ -935,29 +1641,21 @@ class Tower:
             center_y = self.pixel_y + self.render_h // 4  # Shoot from top quarter of tower
             target_x = player.pixel_x + player.tile_w // 2
             target_y = player.pixel_y + player.tile_h // 2
-            return Projectile(center_x, center_y, target_x, target_y, self.attack_damage,
-                              is_enemy=True, projectile_type=self.tower_type)
+            return Projectile.pool.acquire(center_x, center_y, target_x, target_y, self.attack_damage,
+                                           is_enemy=True, projectile_type=self.tower_type)
 
         return None
 
-    def draw(self, surface, camera_x, camera_y):
-        img = self.image.copy()
-        if self.hit_flash > 0:
-            img.fill((255, 255, 255, 100), special_flags=pygame.BLEND_RGB_ADD)
-        if self.state == State.DEAD:
-            img.set_alpha(100)
-        surface.blit(img, (self.pixel_x - camera_x, self.pixel_y - camera_y))
+    def render(self, queue, camera_x, camera_y):
+        img = sprites.get(self.image, flash=self.hit_flash > 0,
+                          faded=self.state == State.DEAD)
+        queue.submit(img, (self.pixel_x - camera_x, self.pixel_y - camera_y),
+                     self.pixel_y + self.render_h)
 
         if self.state != State.DEAD:
-            bar_width = self.render_w
-            bar_height = 6
-            bar_x = self.pixel_x - camera_x
-            bar_y = self.pixel_y - camera_y - 12
-            pygame.draw.rect(surface, (100, 0, 0),
-                             (bar_x, bar_y, bar_width, bar_height))
-            health_width = int((self.health / self.max_health) * bar_width)
-            pygame.draw.rect(surface, (255, 0, 0),
-                             (bar_x, bar_y, health_width, bar_height))
+            queue.submit_bar(self.pixel_x - camera_x, self.pixel_y - camera_y - 12, self.render_w, 6,
+                             self.health / self.max_health, (255, 0, 0), (100, 0, 0),
+                             self.pixel_y + self.render_h)
 
 
 class Boss:
@@ -979,7 +1677,10 @@ class Boss:
         self.shoot_interval = 120
         self.detection_range = 400
 
+        self.hitbox = pygame.Rect(x, y, self.render_w, self.render_h)
+
         self.load_image()
+        sprites.prepare([self.image], faded=True)
 
     def load_image(self):
         try:
@@ -1030,29 +1731,21 @@ class Boss:
             center_y = self.pixel_y + self.render_h // 2
             target_x = player.pixel_x + player.tile_w // 2
             target_y = player.pixel_y + player.tile_h // 2
-            return Projectile(center_x, center_y, target_x, target_y, self.attack_damage,
-                              is_enemy=True, projectile_type='void')
+            return Projectile.pool.acquire(center_x, center_y, target_x, target_y, self.attack_damage,
+                                           is_enemy=True, projectile_type='void')
 
         return None
 
-    def draw(self, surface, camera_x, camera_y):
-        img = self.image.copy()
-        if self.hit_flash > 0:
-            img.fill((255, 255, 255, 100), special_flags=pygame.BLEND_RGB_ADD)
-        if self.state == State.DEAD:
-            img.set_alpha(100)
-        surface.blit(img, (self.pixel_x - camera_x, self.pixel_y - camera_y))
+    def render(self, queue, camera_x, camera_y):
+        img = sprites.get(self.image, flash=self.hit_flash > 0,
+                          faded=self.state == State.DEAD)
+        queue.submit(img, (self.pixel_x - camera_x, self.pixel_y - camera_y),
+                     self.pixel_y + self.render_h)
 
         if self.state != State.DEAD:
-            bar_width = self.render_w
-            bar_height = 8
-            bar_x = self.pixel_x - camera_x
-            bar_y = self.pixel_y - camera_y - 15
-            pygame.draw.rect(surface, (100, 0, 0),
-                             (bar_x, bar_y, bar_width, bar_height))
-            health_width = int((self.health / self.max_health) * bar_width)
-            pygame.draw.rect(surface, (255, 0, 0),
-                             (bar_x, bar_y, health_width, bar_height))
+            queue.submit_bar(self.pixel_x - camera_x, self.pixel_y - camera_y - 15, self.render_w, 8,
+                             self.health / self.max_health, (255, 0, 0), (100, 0, 0),
+                             self.pixel_y + self.render_h)
 
 
 class Camera:
@@ -1075,11 +1768,958 @@ class Camera:
         self.screen_height = screen_height
 
 
+class RenderQueue:
+    """Per-frame list of sprites, drawn depth-sorted in one Surface.blits() batch.
+
+    Entities submit a Surface, its screen position and a depth: the world y
+    of their feet, so whatever stands lower on the map is drawn over what
+    stands behind it. Equal depths keep submission order and OVERLAY goes
+    above everything. Items outside the view (the camera's screen rect) are
+    culled on submit. Health bars take their owner's depth, so they are
+    filled right after its sprite and covered by whatever stands in front;
+    the sprites between two bars go out in one blits() call.
+    """
+
+    OVERLAY = math.inf
+
+    def __init__(self):
+        self.view = pygame.Rect(0, 0, 0, 0)
+        self.items = []
+        self.submitted = 0
+        self.culled = 0
+        self.drawn = 0
+        self.bars_drawn = 0
+
+    def begin(self, view):
+        self.view = pygame.Rect(view)
+        self.items = []
+        self.submitted = 0
+        self.culled = 0
+
+    def visible(self, x, y, w, h):
+        view = self.view
+        return x < view.right and y < view.bottom and x + w > view.left and y + h > view.top
+
+    def submit(self, surface, pos, depth):
+        self.submitted += 1
+        w, h = surface.get_size()
+        if self.visible(pos[0], pos[1], w, h):
+            self.items.append((depth, surface, pos))
+        else:
+            self.culled += 1
+
+    def count_culled(self, count):
+        """Record items culled before they were submitted (e.g. by a vectorized test)"""
+        self.submitted += count
+        self.culled += count
+
+    def submit_bar(self, x, y, w, h, fraction, color, bg_color, depth):
+        """Queue a health bar; items with no surface are bars (rect, fill width, colors)"""
+        self.submitted += 1
+        if self.visible(x, y, w, h):
+            self.items.append((depth, None, (pygame.Rect(x, y, w, h), int(fraction * w),
+                                             color, bg_color)))
+        else:
+            self.culled += 1
+
+    def flush(self, surface):
+        self.items.sort(key=lambda item: item[0])
+        batch = []
+        bars = 0
+        for _, image, pos in self.items:
+            if image is not None:
+                batch.append((image, pos))
+                continue
+            if batch:
+                surface.blits(batch, doreturn=False)
+                batch = []
+            rect, fill_w, color, bg_color = pos
+            surface.fill(bg_color, rect)
+            if fill_w > 0:
+                surface.fill(color, (rect.x, rect.y, fill_w, rect.height))
+            bars += 1
+        if batch:
+            surface.blits(batch, doreturn=False)
+        self.drawn = len(self.items) - bars
+        self.bars_drawn = bars
+        self.items = []
+
+    def stats(self):
+        return {'submitted': self.submitted, 'culled': self.culled,
+                'drawn': self.drawn, 'bars': self.bars_drawn}
+
+
+def merge_tile_rects(tiles, tile_w, tile_h):
+    """Cover a set of (x, y) tiles with as few rects as a greedy merge allows.
+
+    Each row is split into horizontal runs, then runs spanning the same
+    columns on consecutive rows are stacked into one rect. The rects cover
+    exactly the same pixels as one rect per tile would.
+    """
+    rows = {}
+    for x, y in tiles:
+        rows.setdefault(y, []).append(x)
+
+    rects = []
+    open_runs = {}
+    for y in sorted(rows):
+        xs = sorted(rows[y])
+        runs = []
+        start = prev = xs[0]
+        for x in xs[1:]:
+            if x != prev + 1:
+                runs.append((start, prev + 1))
+                start = x
+            prev = x
+        runs.append((start, prev + 1))
+
+        next_open = {}
+        for run in runs:
+            top, bottom = open_runs.pop(run, (y, y))
+            if bottom != y:
+                # Gap since the run was last seen, close it and start again
+                rects.append((run, top, bottom))
+                top = y
+            next_open[run] = (top, y + 1)
+        for run, (top, bottom) in open_runs.items():
+            rects.append((run, top, bottom))
+        open_runs = next_open
+    for run, (top, bottom) in open_runs.items():
+        rects.append((run, top, bottom))
+
+    return [pygame.Rect(x0 * tile_w, top * tile_h, (x1 - x0) * tile_w, (bottom - top) * tile_h)
+            for (x0, x1), top, bottom in rects]
+
+
+class CollisionIndex:
+    """Spatial index over a map's collision rects, built once per map load.
+
+    Tile-aligned rects are rasterised into a boolean tile grid, so a lookup
+    only touches the tiles a rect overlaps. Anything else goes into a spatial
+    hash of cell_size buckets. Results match testing colliderect() against
+    every rect in the original list.
+    """
+
+    def __init__(self, rects, tile_w, tile_h, width, height, cell_size=64):
+        self.tile_w = tile_w
+        self.tile_h = tile_h
+        self.width = width
+        self.height = height
+        self.cell_size = cell_size
+        self.grid = bytearray(width * height)
+        self.buckets = {}
+        self.loose_count = 0
+
+        map_rect = pygame.Rect(0, 0, width * tile_w, height * tile_h)
+        for rect in rects:
+            if rect.width <= 0 or rect.height <= 0:
+                continue
+            if (rect.x % tile_w == 0 and rect.y % tile_h == 0 and rect.width % tile_w == 0
+                    and rect.height % tile_h == 0 and map_rect.contains(rect)):
+                tx0 = rect.x // tile_w
+                tx1 = tx0 + rect.width // tile_w
+                for ty in range(rect.y // tile_h, (rect.y + rect.height) // tile_h):
+                    row = ty * width
+                    self.grid[row + tx0:row + tx1] = b'\x01' * (tx1 - tx0)
+            else:
+                rect = pygame.Rect(rect)
+                for cell in self.cells(rect):
+                    self.buckets.setdefault(cell, []).append(rect)
+                self.loose_count += 1
+
+    def cells(self, rect):
+        size = self.cell_size
+        for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+            for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+                yield cx, cy
+
+    def tile_span(self, rect):
+        """Clamped (tx0, ty0, tx1, ty1) of the grid tiles rect overlaps, or None"""
+        tx0 = max(0, rect.left // self.tile_w)
+        ty0 = max(0, rect.top // self.tile_h)
+        tx1 = min(self.width - 1, (rect.right - 1) // self.tile_w)
+        ty1 = min(self.height - 1, (rect.bottom - 1) // self.tile_h)
+        if tx0 > tx1 or ty0 > ty1:
+            return None
+        return tx0, ty0, tx1, ty1
+
+    def blocked_mask(self, left, top, w, h):
+        """Vectorized is_blocked() for NumPy arrays of rect corners.
+
+        Rects must be no larger than one tile, so checking the tiles under
+        their four corners covers every tile they overlap.
+        """
+        grid = np.frombuffer(self.grid, dtype=np.uint8).reshape(
+            self.height, self.width)
+        left = left.astype(np.int64)
+        top = top.astype(np.int64)
+        blocked = np.zeros(len(left), dtype=bool)
+        for cx in (left // self.tile_w, (left + w - 1) // self.tile_w):
+            for cy in (top // self.tile_h, (top + h - 1) // self.tile_h):
+                inside = (cx >= 0) & (cx < self.width) & (
+                    cy >= 0) & (cy < self.height)
+                blocked[inside] |= grid[cy[inside], cx[inside]] == 1
+        if self.buckets:
+            for i in np.flatnonzero(~blocked):
+                blocked[i] = self.is_blocked(
+                    pygame.Rect(int(left[i]), int(top[i]), w, h))
+        return blocked
+
+    def tile_blocked(self, tx, ty):
+        return 0 <= tx < self.width and 0 <= ty < self.height and self.grid[ty * self.width + tx] == 1
+
+    def is_blocked(self, rect):
+        """True if rect overlaps any collision rect"""
+        if rect.width <= 0 or rect.height <= 0:
+            return False
+        span = self.tile_span(rect)
+        if span:
+            tx0, ty0, tx1, ty1 = span
+            for ty in range(ty0, ty1 + 1):
+                row = ty * self.width
+                if self.grid.find(1, row + tx0, row + tx1 + 1) != -1:
+                    return True
+        if self.buckets:
+            for cell in self.cells(rect):
+                for other in self.buckets.get(cell, ()):
+                    if rect.colliderect(other):
+                        return True
+        return False
+
+    def query_rect(self, rect):
+        """Return the collision rects overlapping rect, blocked tiles as one rect each"""
+        hits = []
+        if rect.width <= 0 or rect.height <= 0:
+            return hits
+        span = self.tile_span(rect)
+        if span:
+            tx0, ty0, tx1, ty1 = span
+            for ty in range(ty0, ty1 + 1):
+                row = ty * self.width
+                for tx in range(tx0, tx1 + 1):
+                    if self.grid[row + tx]:
+                        hits.append(pygame.Rect(tx * self.tile_w, ty * self.tile_h,
+                                                self.tile_w, self.tile_h))
+        seen = set()
+        for cell in self.cells(rect):
+            for other in self.buckets.get(cell, ()):
+                if id(other) not in seen and rect.colliderect(other):
+                    seen.add(id(other))
+                    hits.append(other)
+        return hits
+
+    def raycast(self, x0, y0, x1, y1):
+        """Return the first blocked point on the segment (x0, y0) -> (x1, y1), or None"""
+        dx = x1 - x0
+        dy = y1 - y0
+        best = None
+        best_t = None
+
+        # Walk the tile grid cell by cell along the ray
+        tx = int(x0 // self.tile_w)
+        ty = int(y0 // self.tile_h)
+        end_tx = int(x1 // self.tile_w)
+        end_ty = int(y1 // self.tile_h)
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        if dx != 0:
+            next_x = (tx + (1 if dx > 0 else 0)) * self.tile_w
+            t_max_x = (next_x - x0) / dx
+            t_delta_x = self.tile_w / abs(dx)
+        else:
+            t_max_x = t_delta_x = math.inf
+        if dy != 0:
+            next_y = (ty + (1 if dy > 0 else 0)) * self.tile_h
+            t_max_y = (next_y - y0) / dy
+            t_delta_y = self.tile_h / abs(dy)
+        else:
+            t_max_y = t_delta_y = math.inf
+
+        t = 0.0
+        while t <= 1.0:
+            if self.tile_blocked(tx, ty):
+                best_t = t
+                break
+            if tx == end_tx and ty == end_ty:
+                break
+            if t_max_x < t_max_y:
+                t = t_max_x
+                t_max_x += t_delta_x
+                tx += step_x
+            else:
+                t = t_max_y
+                t_max_y += t_delta_y
+                ty += step_y
+
+        if self.buckets:
+            bounds = pygame.Rect(min(x0, x1), min(y0, y1),
+                                 abs(dx) + 1, abs(dy) + 1)
+            for cell in self.cells(bounds):
+                for other in self.buckets.get(cell, ()):
+                    clipped = other.clipline((x0, y0), (x1, y1))
+                    if clipped:
+                        px, py = clipped[0]
+                        length_sq = dx * dx + dy * dy
+                        t_hit = ((px - x0) * dx + (py - y0) * dy) / \
+                            length_sq if length_sq else 0.0
+                        if best_t is None or t_hit < best_t:
+                            best_t = t_hit
+
+        if best_t is not None:
+            best = (x0 + dx * best_t, y0 + dy * best_t)
+        return best
+
+
+class TileRenderer:
+    """Draws a map's tile layers from pre-composited chunk Surfaces.
+
+    Each chunk holds chunk_size x chunk_size tiles of every visible tile layer
+    and is rendered the first time it comes into view; draw() only blits the
+    chunks that intersect the camera. With keep_radius set, chunks more than
+    that many chunks away from the view are dropped to bound memory. With
+    chunk_dir set the chunks are read from PNGs baked by MapCache instead of
+    being composited from tmx_data; if one cannot be read the renderer falls
+    back to tmx_loader() and composites from then on.
+    """
+
+    def __init__(self, tmx_data, tile_w, tile_h, width, height, chunk_size=16, keep_radius=None,
+                 chunk_dir=None, tmx_loader=None):
+        self.tmx_data = tmx_data
+        self.chunk_dir = chunk_dir
+        self.tmx_loader = tmx_loader
+        self.tile_w = tile_w
+        self.tile_h = tile_h
+        self.width = width
+        self.height = height
+        self.chunk_size = chunk_size
+        self.chunk_w = chunk_size * tile_w
+        self.chunk_h = chunk_size * tile_h
+        self.keep_radius = keep_radius
+        self.chunks = {}
+        # Bumped whenever chunks are invalidated, so cached copies of the map can tell
+        self.generation = 0
+        self.layer_key = self.visible_layer_key()
+
+    def visible_layer_key(self):
+        if self.chunk_dir is not None:
+            return ()
+        return tuple(id(layer) for layer in self.tmx_data.visible_layers
+                     if isinstance(layer, pytmx.TiledTileLayer))
+
+    def invalidate(self, tile_x=None, tile_y=None):
+        """Drop the chunk holding tile (tile_x, tile_y), or every chunk if no tile is given"""
+        self.generation += 1
+        if tile_x is None or tile_y is None:
+            self.chunks.clear()
+        else:
+            self.chunks.pop((tile_x // self.chunk_size,
+                            tile_y // self.chunk_size), None)
+
+    def render_chunk(self, cx, cy, convert=True):
+        x0 = cx * self.chunk_size
+        y0 = cy * self.chunk_size
+        x1 = min(x0 + self.chunk_size, self.width)
+        y1 = min(y0 + self.chunk_size, self.height)
+        if self.chunk_dir is not None:
+            try:
+                return pygame.image.load(os.path.join(self.chunk_dir, f'{cx}_{cy}.png')).convert()
+            except Exception as e:
+                print(f"Error loading baked chunk {cx},{cy}: {e}")
+                self.chunk_dir = None
+                self.tmx_data = self.tmx_loader()
+        chunk = pygame.Surface(
+            ((x1 - x0) * self.tile_w, (y1 - y0) * self.tile_h))
+        if convert:
+            chunk = chunk.convert()
+        chunk.fill((0, 0, 0))
+
+        images = self.tmx_data.images
+        for layer in self.tmx_data.visible_layers:
+            if not isinstance(layer, pytmx.TiledTileLayer):
+                continue
+            for y in range(y0, y1):
+                row = layer.data[y]
+                for x in range(x0, x1):
+                    gid = row[x]
+                    image = images[gid] if gid else None
+                    if image:
+                        chunk.blit(image, ((x - x0) * self.tile_w,
+                                   (y - y0) * self.tile_h))
+        return chunk
+
+    def visible_chunks(self, camera_x, camera_y, view_w, view_h):
+        cols = -(-self.width // self.chunk_size)
+        rows = -(-self.height // self.chunk_size)
+        cx0 = max(0, int(camera_x // self.chunk_w))
+        cy0 = max(0, int(camera_y // self.chunk_h))
+        cx1 = min(cols - 1, int((camera_x + view_w - 1) // self.chunk_w))
+        cy1 = min(rows - 1, int((camera_y + view_h - 1) // self.chunk_h))
+        return cx0, cy0, cx1, cy1
+
+    def sync_layers(self):
+        """Drop every chunk if the set of visible tile layers changed since they were rendered"""
+        layer_key = self.visible_layer_key()
+        if layer_key != self.layer_key:
+            self.layer_key = layer_key
+            self.invalidate()
+
+    def chunk(self, cx, cy):
+        chunk = self.chunks.get((cx, cy))
+        if chunk is None:
+            chunk = self.chunks[(cx, cy)] = self.render_chunk(cx, cy)
+        return chunk
+
+    def evict(self, cx0, cy0, cx1, cy1):
+        """Drop chunks more than keep_radius chunks outside the given chunk range"""
+        if self.keep_radius is not None:
+            r = self.keep_radius
+            for key in [k for k in self.chunks
+                        if not (cx0 - r <= k[0] <= cx1 + r and cy0 - r <= k[1] <= cy1 + r)]:
+                del self.chunks[key]
+
+    def draw(self, surface, camera_x, camera_y):
+        self.sync_layers()
+        cx0, cy0, cx1, cy1 = self.visible_chunks(
+            camera_x, camera_y, surface.get_width(), surface.get_height())
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                surface.blit(self.chunk(cx, cy), (cx * self.chunk_w - camera_x,
+                                                  cy * self.chunk_h - camera_y))
+        self.evict(cx0, cy0, cx1, cy1)
+
+    def draw_region(self, surface, world_rect, dest_rect):
+        """Paint the map pixels under world_rect into dest_rect of surface (same size, black off-map)"""
+        clip = surface.get_clip()
+        surface.set_clip(dest_rect)
+        surface.fill((0, 0, 0), dest_rect)
+        offset_x = dest_rect.x - world_rect.x
+        offset_y = dest_rect.y - world_rect.y
+        cx0, cy0, cx1, cy1 = self.visible_chunks(
+            world_rect.x, world_rect.y, world_rect.width, world_rect.height)
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                surface.blit(self.chunk(cx, cy), (cx * self.chunk_w + offset_x,
+                                                  cy * self.chunk_h + offset_y))
+        surface.set_clip(clip)
+
+
+class ScrollBuffer:
+    """Map-only frame kept a margin larger than the screen and scrolled with the camera.
+
+    While the view stays inside the buffer drawing the map is one blit.
+    When it leaves, the buffer is re-centred with Surface.scroll() and only
+    the strips that came into view are painted from the renderer's chunks.
+    Cameras are floored to whole pixels.
+    """
+
+    def __init__(self, margin=64):
+        self.margin = margin
+        self.surface = None
+        self.renderer = None
+        self.generation = None
+        self.origin = (0, 0)
+        self.repaints = 0
+        self.strips = 0
+
+    def draw(self, surface, renderer, camera_x, camera_y):
+        renderer.sync_layers()
+        cam_x = math.floor(camera_x)
+        cam_y = math.floor(camera_y)
+        view_w, view_h = surface.get_size()
+        size = (view_w + 2 * self.margin, view_h + 2 * self.margin)
+        if self.surface is None or self.surface.get_size() != size or \
+                renderer is not self.renderer or renderer.generation != self.generation:
+            if self.surface is None or self.surface.get_size() != size:
+                self.surface = pygame.Surface(size).convert()
+            self.renderer = renderer
+            self.generation = renderer.generation
+            self.recentre(cam_x, cam_y, full=True)
+        else:
+            ox, oy = self.origin
+            if cam_x < ox or cam_y < oy or cam_x + view_w > ox + size[0] or \
+                    cam_y + view_h > oy + size[1]:
+                self.recentre(cam_x, cam_y)
+        ox, oy = self.origin
+        surface.blit(self.surface, (0, 0), (cam_x - ox, cam_y - oy, view_w, view_h))
+
+    def recentre(self, cam_x, cam_y, full=False):
+        buf_w, buf_h = self.surface.get_size()
+        new_origin = (cam_x - self.margin, cam_y - self.margin)
+        # How far the existing pixels move within the buffer
+        dx = self.origin[0] - new_origin[0]
+        dy = self.origin[1] - new_origin[1]
+        self.origin = new_origin
+        if full or abs(dx) >= buf_w or abs(dy) >= buf_h:
+            self.paint(pygame.Rect(0, 0, buf_w, buf_h))
+            self.repaints += 1
+        else:
+            self.surface.scroll(dx, dy)
+            if dx > 0:
+                self.paint(pygame.Rect(0, 0, dx, buf_h))
+            elif dx < 0:
+                self.paint(pygame.Rect(buf_w + dx, 0, -dx, buf_h))
+            if dy > 0:
+                self.paint(pygame.Rect(0, 0, buf_w, dy))
+            elif dy < 0:
+                self.paint(pygame.Rect(0, buf_h + dy, buf_w, -dy))
+        self.renderer.evict(*self.renderer.visible_chunks(
+            self.origin[0], self.origin[1], buf_w, buf_h))
+
+    def paint(self, rect):
+        self.renderer.draw_region(self.surface, rect.move(self.origin), rect)
+        self.strips += 1
+
+
+class MapObject:
+    """Plain copy of a Tiled object (what the map builders read from it)"""
+
+    def __init__(self, name, type, x, y, width=0, height=0, properties=None):
+        self.name = name
+        self.type = type
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.properties = properties or {}
+
+    @classmethod
+    def from_tiled(cls, obj):
+        return cls(getattr(obj, 'name', None), getattr(obj, 'type', None), obj.x, obj.y,
+                   getattr(obj, 'width', 0), getattr(obj, 'height', 0),
+                   dict(getattr(obj, 'properties', {}) or {}))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def to_dict(self):
+        return {'name': self.name, 'type': self.type, 'x': self.x, 'y': self.y,
+                'width': self.width, 'height': self.height, 'properties': self.properties}
+
+
+class MapCache:
+    """Compiled maps stored under cache_dir so loads skip TMX parsing.
+
+    An entry is keyed by a hash of the TMX and every TSX and tileset image it
+    references, and holds the merged collision rects, the map objects and
+    one PNG per renderer chunk. Entries are written the first time a map is
+    parsed and older entries for the same map are removed. index.json
+    remembers each map's hash with the mtime and size of the files behind
+    it, so while none of them change a load is a few stat() calls rather
+    than parsing the TMX/TSX files to find and hash them.
+    """
+
+    VERSION = 2
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.index = None
+        self.index_lock = threading.Lock()
+        self.file_hashes = {}
+        self.hits = 0
+        self.misses = 0
+
+    def dependencies(self, tmx_file):
+        """The TSX and image files a TMX references, resolved the way the loader finds them"""
+        import xml.etree.ElementTree as ET
+
+        tmx_dir = os.path.dirname(os.path.abspath(tmx_file))
+
+        def resolve(src, base_dir):
+            for candidate in (os.path.join(base_dir, src), os.path.join(tmx_dir, os.path.basename(src))):
+                if os.path.exists(candidate):
+                    return candidate
+            return src
+
+        deps = []
+        root = ET.parse(tmx_file).getroot()
+        for tileset in root.findall('tileset'):
+            src = tileset.get('source')
+            if src:
+                tsx_path = resolve(src, tmx_dir)
+                deps.append(tsx_path)
+                if os.path.exists(tsx_path):
+                    for img in ET.parse(tsx_path).getroot().iter('image'):
+                        deps.append(resolve(img.get('source', ''), os.path.dirname(tsx_path)))
+            for img in tileset.iter('image'):
+                deps.append(resolve(img.get('source', ''), tmx_dir))
+        return deps
+
+    def file_hash(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return 'missing:' + os.path.basename(path)
+        stamp = (path, st.st_mtime_ns, st.st_size)
+        digest = self.file_hashes.get(stamp)
+        if digest is None:
+            with open(path, 'rb') as f:
+                digest = self.file_hashes[stamp] = hashlib.sha1(f.read()).hexdigest()
+        return digest
+
+    @staticmethod
+    def file_stamp(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def load_index(self):
+        if self.index is None:
+            try:
+                with open(self.index_path, encoding='utf-8') as f:
+                    self.index = json.load(f)
+            except (OSError, ValueError):
+                self.index = {}
+        return self.index
+
+    def save_index(self):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f)
+            os.replace(tmp, self.index_path)
+        except OSError as e:
+            print(f"Error writing map cache index: {e}")
+
+    def content_hash(self, tmx_file):
+        key = os.path.abspath(tmx_file)
+        with self.index_lock:
+            known = self.load_index().get(key)
+        if known is not None and known['version'] == self.VERSION and \
+                all(self.file_stamp(path) == stamp for path, stamp in known['files']):
+            return known['digest']
+
+        paths = [key] + [os.path.abspath(path) for path in self.dependencies(tmx_file)]
+        h = hashlib.sha1(f"v{self.VERSION}".encode())
+        for path in paths:
+            h.update(self.file_hash(path).encode())
+        digest = h.hexdigest()[:16]
+        with self.index_lock:
+            self.load_index()[key] = {'version': self.VERSION, 'digest': digest,
+                                      'files': [[path, self.file_stamp(path)] for path in paths]}
+            self.save_index()
+        return digest
+
+    def entry_dir(self, tmx_file, digest):
+        name = os.path.splitext(os.path.basename(tmx_file))[0]
+        return os.path.join(self.cache_dir, f"{name}-{digest}")
+
+    def load(self, tmx_file):
+        """The baked entry for tmx_file as a dict, or None on a miss"""
+        try:
+            entry = self.entry_dir(tmx_file, self.content_hash(tmx_file))
+            meta_path = os.path.join(entry, 'meta.json')
+            if not os.path.exists(meta_path):
+                self.misses += 1
+                return None
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(os.path.join(entry, 'objects.json'), encoding='utf-8') as f:
+                objects = json.load(f)
+            self.hits += 1
+            return {'meta': meta, 'objects': objects,
+                    'collision': meta['collision'], 'chunk_dir': os.path.join(entry, 'chunks')}
+        except Exception as e:
+            print(f"Error reading map cache for {tmx_file}: {e}")
+            self.misses += 1
+            return None
+
+    def store(self, tmx_file, game_map):
+        try:
+            entry = self.entry_dir(tmx_file, self.content_hash(tmx_file))
+            if os.path.exists(entry):
+                return
+            # Maps can be baked from the prefetch thread too, so each writer
+            # gets its own staging directory
+            tmp = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(os.path.join(tmp, 'chunks'))
+
+            renderer = game_map.renderer
+            cols = -(-game_map.width // renderer.chunk_size)
+            rows = -(-game_map.height // renderer.chunk_size)
+            for cy in range(rows):
+                for cx in range(cols):
+                    pygame.image.save(renderer.render_chunk(cx, cy, convert=False),
+                                      os.path.join(tmp, 'chunks', f'{cx}_{cy}.png'))
+
+            with open(os.path.join(tmp, 'objects.json'), 'w', encoding='utf-8') as f:
+                json.dump([obj.to_dict() for obj in game_map.objects], f, default=str)
+            meta = {'version': self.VERSION, 'source': os.path.basename(tmx_file),
+                    'tile_w': game_map.tile_w, 'tile_h': game_map.tile_h,
+                    'width': game_map.width, 'height': game_map.height,
+                    'chunk_size': renderer.chunk_size,
+                    'collision': [list(r) for r in game_map.collision_rects],
+                    'collision_stats': game_map.collision_stats}
+            with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+
+            prefix = os.path.basename(self.entry_dir(tmx_file, ''))
+            for old in os.listdir(self.cache_dir):
+                if old.startswith(prefix) and not old.endswith('.tmp'):
+                    shutil.rmtree(os.path.join(self.cache_dir, old), ignore_errors=True)
+            try:
+                os.replace(tmp, entry)
+            except OSError:
+                # Another thread finished the same entry first
+                shutil.rmtree(tmp, ignore_errors=True)
+                return
+            print(f"Baked {os.path.basename(tmx_file)} into {entry}")
+        except Exception as e:
+            print(f"Error writing map cache for {tmx_file}: {e}")
+
+
+map_cache = MapCache(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), 'map', '.cache'))
+
+
+def deferred_image_loader(filename, colorkey, **kwargs):
+    """pytmx image loader that never touches the display, for parsing maps on a worker thread.
+
+    Tiles come back unconverted (with their colorkey set, so they already
+    draw correctly); convert_tmx_images() converts them on the main thread.
+    """
+    handle_transformation = pytmx.util_pygame.handle_transformation
+    if colorkey:
+        colorkey = pygame.Color(f"#{colorkey}")
+    image = pygame.image.load(filename)
+
+    def load_image(rect=None, flags=None):
+        tile = image.subsurface(rect) if rect else image.copy()
+        if flags:
+            tile = handle_transformation(tile, flags)
+        if colorkey:
+            tile.set_colorkey(colorkey)
+        return tile
+    return load_image
+
+
+def convert_tmx_images(tmx_data):
+    """Convert tiles loaded by deferred_image_loader to the display format"""
+    smart_convert = pytmx.util_pygame.smart_convert
+    images = tmx_data.images
+    for i, image in enumerate(images):
+        if image:
+            images[i] = smart_convert(image, image.get_colorkey(), True)
+
+
+class MapResidency:
+    """Recently visited GameMaps kept in memory for instant returns.
+
+    Holds up to ``capacity`` maps not currently in play, within a budget of
+    ``budget_bytes`` (tiles, baked chunks and collision grid,
+    as estimated by GameMap.resident_bytes()). Each entry keeps its parsed
+    tiles, collision index and entities, plus whatever entity state the
+    game hands in (its slimes). The least recently visited map is evicted
+    first.
+    """
+
+    def __init__(self, capacity=4, budget_bytes=256 * 1024 * 1024):
+        self.capacity = capacity
+        self.budget_bytes = budget_bytes
+        self.entries = OrderedDict()
+        self.bytes_held = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, tmx_file):
+        return os.path.abspath(tmx_file)
+
+    def __contains__(self, tmx_file):
+        return self.key(tmx_file) in self.entries
+
+    def put(self, tmx_file, game_map, state=None):
+        key = self.key(tmx_file)
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes_held -= old[2]
+        size = game_map.resident_bytes()
+        self.entries[key] = (game_map, state, size)
+        self.bytes_held += size
+        while self.entries and (len(self.entries) > self.capacity or self.bytes_held > self.budget_bytes):
+            _, (_, _, evicted_size) = self.entries.popitem(last=False)
+            self.bytes_held -= evicted_size
+            self.evictions += 1
+
+    def take(self, tmx_file):
+        """Remove and return (game_map, state) for tmx_file, or None if it is not resident"""
+        entry = self.entries.pop(self.key(tmx_file), None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.bytes_held -= entry[2]
+        return entry[0], entry[1]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions, 'resident': len(self.entries),
+                'bytes': self.bytes_held}
+
+
+class MapPrefetcher:
+    """Builds teleport destinations on a worker thread so teleporting is a swap.
+
+    request() queues a map; the worker parses it (or reads it from the map
+    cache) without touching the display. poll(), called once per frame on
+    the main thread, finishes completed maps (tile conversion, towers,
+    bosses, NPCs) and puts them in the MapResidency alongside visited maps.
+    take() hands over a map that is still building, waiting for it.
+    """
+
+    def __init__(self, residency, cache=None):
+        self.residency = residency
+        self.cache = cache
+        self.pending = {}
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='map-prefetch')
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, tmx_file):
+        return os.path.abspath(tmx_file)
+
+    def request(self, tmx_file):
+        key = self.key(tmx_file)
+        if key not in self.residency and key not in self.pending:
+            self.pending[key] = self.executor.submit(
+                GameMap, tmx_file, cache=self.cache,
+                image_loader=deferred_image_loader, build_entities=False)
+
+    def finish(self, key, future):
+        """Main-thread completion of a built map; returns it, or None if building failed"""
+        try:
+            game_map = future.result()
+            game_map.finish_loading()
+            return game_map
+        except Exception as e:
+            print(f"Prefetch of {os.path.basename(key)} failed: {e}")
+            return None
+
+    def poll(self):
+        for key in [k for k, future in self.pending.items() if future.done()]:
+            game_map = self.finish(key, self.pending.pop(key))
+            if game_map is not None:
+                self.residency.put(key, game_map)
+
+    def take(self, tmx_file):
+        """The GameMap still being built for tmx_file, or None if none is pending"""
+        key = self.key(tmx_file)
+        game_map = self.finish(key, self.pending.pop(key)) if key in self.pending else None
+        if game_map is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return game_map
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'pending': len(self.pending)}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
 class GameMap:
-    def __init__(self, tmx_file):
+    def __init__(self, tmx_file, cache=None, image_loader=None, build_entities=True):
         self.current_map_file = tmx_file  # Store for tower building
+        self._tmx_data = None
+        # A display-free image_loader lets the map be parsed off the main
+        # thread; finish_loading() then converts the tiles and adds entities
+        self.image_loader = image_loader
+        self.entities_built = False
+        # Set once the game has been on this map; prefetched maps are fresh
+        self.played = False
+        baked = cache.load(tmx_file) if cache is not None else None
+        if baked is not None:
+            meta = baked['meta']
+            self.tile_w = meta['tile_w']
+            self.tile_h = meta['tile_h']
+            self.width = meta['width']
+            self.height = meta['height']
+            self.objects = [MapObject.from_dict(obj) for obj in baked['objects']]
+            self.collision_rects = [pygame.Rect(r) for r in baked['collision']]
+            self.collision_stats = meta['collision_stats']
+            self.renderer = TileRenderer(None, self.tile_w, self.tile_h, self.width, self.height,
+                                         chunk_size=meta['chunk_size'], keep_radius=2,
+                                         chunk_dir=baked['chunk_dir'],
+                                         tmx_loader=lambda: self.tmx_data)
+            print(f"Loaded baked map {os.path.basename(tmx_file)} "
+                  f"({len(self.collision_rects)} collision rects)")
+        else:
+            self.tmx_data = self.load_tmx(tmx_file)
+            self.tile_w = self.tmx_data.tilewidth
+            self.tile_h = self.tmx_data.tileheight
+            self.width = self.tmx_data.width
+            self.height = self.tmx_data.height
+            self.objects = [MapObject.from_tiled(obj)
+                            for obj in getattr(self.tmx_data, 'objects', [])]
+            self.collision_rects = self.build_collision_rects()
+            self.renderer = TileRenderer(self.tmx_data, self.tile_w, self.tile_h,
+                                         self.width, self.height, keep_radius=2)
+            if cache is not None:
+                cache.store(tmx_file, self)
+
+        self.collision = CollisionIndex(self.collision_rects, self.tile_w, self.tile_h,
+                                        self.width, self.height)
+        self.teleports = self.build_teleports()
+        if build_entities:
+            self.finish_loading()
+
+    def finish_loading(self):
+        """Main-thread half of loading: convert deferred tile images and build the entities"""
+        if self.image_loader is not None:
+            if self._tmx_data is not None:
+                convert_tmx_images(self._tmx_data)
+            self.image_loader = None
+        if not self.entities_built:
+            self.bosses = self.build_bosses()
+            self.towers = self.build_towers()
+            self.npcs = self.build_npcs()
+            self.entities_built = True
+
+    def reset_entities(self):
+        """Rebuild towers, bosses and NPCs from scratch"""
+        self.entities_built = False
+        self.finish_loading()
+
+    def resident_bytes(self):
+        """Rough memory held by this map: tiles, rendered chunks and collision grid"""
+        def surface_bytes(surf):
+            return surf.get_width() * surf.get_height() * surf.get_bytesize()
+
+        total = len(self.collision.grid)
+        total += sum(surface_bytes(chunk) for chunk in self.renderer.chunks.values())
+        if self._tmx_data is not None:
+            total += sum(surface_bytes(img) for img in self._tmx_data.images if img)
+        return total
+
+    def parse_tmx(self, tmx_file):
+        load_pytmx()
+        if self.image_loader is not None:
+            return pytmx.TiledMap(tmx_file, image_loader=self.image_loader)
+        return pytmx.util_pygame.load_pygame(tmx_file)
+
+    @property
+    def tmx_data(self):
+        """The parsed TMX; baked maps only parse it if something asks for it"""
+        if self._tmx_data is None:
+            self._tmx_data = self.load_tmx(self.current_map_file)
+        return self._tmx_data
+
+    @tmx_data.setter
+    def tmx_data(self, tmx_data):
+        self._tmx_data = tmx_data
+
+    def load_tmx(self, tmx_file):
         try:
-            self.tmx_data = load_pygame(tmx_file)
+            return self.parse_tmx(tmx_file)
         except Exception as e:
             print(f"Error loading TMX file: {e}")
             print("Attempting to auto-fix tileset source paths...")
@@ -1217,7 +2857,7 @@ class GameMap:
                         pass
 
                 try:
-                    self.tmx_data = load_pygame(fixed_path)
+                    return self.parse_tmx(fixed_path)
                 except Exception as load_err:
                     print("Auto-fix failed when loading the fixed TMX:", load_err)
                     raise
@@ -1225,18 +2865,17 @@ class GameMap:
                 print("No local tileset files found to fix the TMX.\nMake sure your .tsx files are next to the .tmx or adjust paths in the TMX.")
                 raise
 
-        self.tile_w = self.tmx_data.tilewidth
-        self.tile_h = self.tmx_data.tileheight
-        self.width = self.tmx_data.width
-        self.height = self.tmx_data.height
-        self.collision_rects = self.build_collision_rects()
-        self.teleports = self.build_teleports()
-        self.bosses = self.build_bosses()
-        self.towers = self.build_towers()
-        self.npcs = self.build_npcs()
-
     def build_collision_rects(self):
-        rects = []
+        blocked = self.build_blocked_tiles()
+        rects = merge_tile_rects(
+            blocked, self.tmx_data.tilewidth, self.tmx_data.tileheight)
+        self.collision_stats = {'tiles': len(blocked), 'rects': len(rects)}
+        print(
+            f"Merged {len(blocked)} blocked tiles into {len(rects)} collision rects")
+        return rects
+
+    def build_blocked_tiles(self):
+        tiles = set()
         layers = list(self.tmx_data.visible_layers)
 
         if layers:
@@ -1245,17 +2884,15 @@ class GameMap:
                 if bottom_layer.properties.get("blocked") or bottom_layer.name.lower() == "collision":
                     for x, y, gid in bottom_layer.tiles():
                         if gid != 0:
-                            rects.append(pygame.Rect(x * self.tmx_data.tilewidth, y * self.tmx_data.tileheight,
-                                                     self.tmx_data.tilewidth, self.tmx_data.tileheight))
-                    return rects
+                            tiles.add((x, y))
+                    return tiles
 
         try:
             collision_layer = self.tmx_data.get_layer_by_name("collision")
             if collision_layer and collision_layer.properties.get("blocked"):
                 for x, y, gid in collision_layer.tiles():
                     if gid != 0:
-                        rects.append(pygame.Rect(x * self.tmx_data.tilewidth, y * self.tmx_data.tileheight,
-                                                 self.tmx_data.tilewidth, self.tmx_data.tileheight))
+                        tiles.add((x, y))
         except Exception as e:
             print(f"Warning: Could not load collision layer: {e}")
 
@@ -1264,14 +2901,13 @@ class GameMap:
                 if layer.properties.get("blocked"):
                     for x, y, gid in layer.tiles():
                         if gid != 0:
-                            rects.append(pygame.Rect(x * self.tmx_data.tilewidth, y * self.tmx_data.tileheight,
-                                                     self.tmx_data.tilewidth, self.tmx_data.tileheight))
-        return rects
+                            tiles.add((x, y))
+        return tiles
 
     def build_teleports(self):
         teleports = []
         try:
-            for obj in getattr(self.tmx_data, 'objects', []):
+            for obj in self.objects:
                 obj_type = getattr(obj, 'type', '') or getattr(obj, 'name', '')
                 if str(obj_type).lower() == 'teleport':
                     props = getattr(obj, 'properties', {}) or {}
@@ -1290,7 +2926,7 @@ class GameMap:
     def build_bosses(self):
         bosses = []
         try:
-            for obj in getattr(self.tmx_data, 'objects', []):
+            for obj in self.objects:
                 obj_type = getattr(obj, 'type', '') or getattr(obj, 'name', '')
                 if str(obj_type).lower() == 'boss':
                     boss = Boss(int(obj.x), int(obj.y),
@@ -1362,7 +2998,7 @@ class GameMap:
                     # Check if location is not in collision
                     test_rect = pygame.Rect(
                         x_pixel, y_pixel, self.tile_w * 3, self.tile_h * 3)
-                    if not any(test_rect.colliderect(r) for r in self.collision_rects):
+                    if not self.collision.is_blocked(test_rect):
                         tower = Tower(x_pixel, y_pixel, self.tile_w,
                                       self.tile_h, tower_type)
                         towers.append(tower)
@@ -1377,7 +3013,7 @@ class GameMap:
     def build_npcs(self):
         npcs = []
         try:
-            for obj in getattr(self.tmx_data, 'objects', []):
+            for obj in self.objects:
                 obj_type = getattr(obj, 'type', '') or getattr(obj, 'name', '')
                 obj_type_lower = str(obj_type).lower()
 
@@ -1415,117 +3051,1080 @@ class GameMap:
         return npcs
 
     def draw(self, surface, camera_x, camera_y):
-        for layer in self.tmx_data.visible_layers:
-            if isinstance(layer, pytmx.TiledTileLayer):
-                for x, y, image in layer.tiles():
-                    if image:
-                        surface.blit(
-                            image, (x*self.tile_w - camera_x, y*self.tile_h - camera_y))
-
+        self.renderer.draw(surface, camera_x, camera_y)
+
+
+class SimulationLOD:
+    """Distance bands deciding how often slimes, bosses and towers are simulated.
+
+    bands is a list of (max_distance, interval) pairs in increasing
+    distance: an entity within max_distance of the player is updated every
+    interval ticks (staggered by its index so a band's work is spread out)
+    and one beyond the last band is frozen. Anything inside the camera view
+    grown by view_margin is always updated every tick, as is everything in
+    the first band, which should cover the largest detection range so
+    nearby gameplay is unchanged.
+    """
+
+    def __init__(self, bands=((800, 1), (2000, 4)), view_margin=128):
+        self.bands = sorted(bands)
+        self.view_margin = view_margin
+        self.view = pygame.Rect(0, 0, 0, 0)
+        self.player_x = 0
+        self.player_y = 0
+        self.tick = 0
+        self.counts = {'full': 0, 'reduced': 0, 'skipped': 0, 'frozen': 0}
+
+    def begin(self, player, camera, tick):
+        m = self.view_margin
+        self.view = pygame.Rect(camera.x - m, camera.y - m,
+                                camera.screen_width + 2 * m, camera.screen_height + 2 * m)
+        self.player_x = player.pixel_x
+        self.player_y = player.pixel_y
+        self.tick = tick
+        self.counts = dict.fromkeys(self.counts, 0)
+
+    def interval(self, x, y, w, h):
+        """Ticks between updates for an entity at (x, y, w, h); 0 means frozen"""
+        view = self.view
+        if x < view.right and y < view.bottom and x + w > view.left and y + h > view.top:
+            return 1
+        distance = math.hypot(x - self.player_x, y - self.player_y)
+        for max_distance, interval in self.bands:
+            if distance <= max_distance:
+                return interval
+        return 0
+
+    def should_update(self, entity, index):
+        interval = self.interval(entity.pixel_x, entity.pixel_y, entity.render_w, entity.render_h)
+        if interval == 1:
+            self.counts['full'] += 1
+            return True
+        if not interval:
+            self.counts['frozen'] += 1
+            return False
+        if (self.tick + index) % interval == 0:
+            self.counts['reduced'] += 1
+            return True
+        self.counts['skipped'] += 1
+        return False
 
-def draw_ui_bar(surface, x, y, w, h, value, max_value, color, bg_color, label):
-    font = pygame.font.Font(None, 20)
-    label_surf = font.render(label, True, (255, 255, 255))
+    def swarm_mask(self, swarm):
+        """Vectorized should_update() over a SlimeSwarm's slimes"""
+        view = self.view
+        x, y = swarm.x, swarm.y
+        in_view = (x < view.right) & (y < view.bottom) & \
+            (x + swarm.render_w > view.left) & (y + swarm.render_h > view.top)
+        distance = np.hypot(x - self.player_x, y - self.player_y)
+        interval = np.zeros(len(x), dtype=np.int64)
+        for max_distance, band_interval in reversed(self.bands):
+            interval[distance <= max_distance] = band_interval
+        interval[in_view] = 1
+        staggered = (self.tick + np.arange(len(x))) % np.maximum(interval, 1) == 0
+        mask = (interval > 0) & staggered
+        full = interval == 1
+        self.counts['full'] += int(np.count_nonzero(full))
+        self.counts['frozen'] += int(np.count_nonzero(interval == 0))
+        self.counts['reduced'] += int(np.count_nonzero(mask & ~full))
+        self.counts['skipped'] += int(np.count_nonzero(~mask & (interval > 1)))
+        return mask
+
+    def stats(self):
+        return dict(self.counts)
+
+
+class EntityGrid:
+    """Uniform grid of entity hitboxes rebuilt each frame for broad-phase hit tests.
+
+    Entities are added as groups (slimes, bosses, towers); query() returns
+    the live entities whose cells a rect touches, ordered by group and then
+    by position in the group so callers can keep first-hit-wins semantics.
+    """
+
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.buckets = {}
+        self.groups = ()
+        self.dirty = False
+
+    def rebuild(self, groups):
+        """Mark the grid stale; buckets are filled on the next query() so frames without hit tests pay nothing"""
+        self.groups = groups
+        self.dirty = True
+
+    def fill(self):
+        self.buckets.clear()
+        self.dirty = False
+        groups = self.groups
+        size = self.cell_size
+        for group_index, entities in enumerate(groups):
+            for order, entity in enumerate(entities):
+                if entity.state == State.DEAD:
+                    continue
+                box = entity.hitbox
+                entry = (group_index, order, entity)
+                for cy in range(box.top // size, (box.bottom - 1) // size + 1):
+                    for cx in range(box.left // size, (box.right - 1) // size + 1):
+                        self.buckets.setdefault((cx, cy), []).append(entry)
+
+    def query(self, rect):
+        if self.dirty:
+            self.fill()
+        size = self.cell_size
+        found = {}
+        for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+            for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+                for entry in self.buckets.get((cx, cy), ()):
+                    found[entry[:2]] = entry
+        return [found[key] for key in sorted(found)]
+
+    def touches(self, left, top, size):
+        """Mask of size x size squares (NumPy arrays of corners) that touch an occupied cell"""
+        if self.dirty:
+            self.fill()
+        if not self.buckets:
+            return np.zeros(len(left), dtype=np.bool_)
+        cells = np.array(list(self.buckets), dtype=np.int64)
+        occupied = np.unique(cells[:, 0] * 65536 + cells[:, 1])
+        left = left.astype(np.int64)
+        top = top.astype(np.int64)
+        cell = self.cell_size
+        mask = np.zeros(len(left), dtype=np.bool_)
+        # A square no bigger than a cell touches at most the cells of its corners
+        for cx in (left // cell, (left + size - 1) // cell):
+            for cy in (top // cell, (top + size - 1) // cell):
+                mask |= np.isin(cx * 65536 + cy, occupied)
+        return mask
+
+
+def draw_ui_bar(surface, x, y, w, h, value, max_value, color, bg_color, label, fill_w=None):
+    label_surf = text_cache.label(label, 20, (255, 255, 255))
     surface.blit(label_surf, (x, y - 18))
     pygame.draw.rect(surface, bg_color, (x, y, w, h))
-    fill_w = int((value / max_value) * w)
+    if fill_w is None:
+        fill_w = int((value / max_value) * w)
     pygame.draw.rect(surface, color, (x, y, fill_w, h))
     pygame.draw.rect(surface, (0, 0, 0), (x, y, w, h), 2)
-    text = font.render(f"{int(value)}/{int(max_value)}", True, (255, 255, 255))
+    text = text_cache.render(f"{int(value)}/{int(max_value)}", 20, (255, 255, 255))
     text_rect = text.get_rect(center=(x + w//2, y + h//2))
     surface.blit(text, text_rect)
 
 
-def spawn_slimes_randomly(map_obj, count=5):
+class HudWidget:
+    """One HUD element, redrawn only when the value it is bound to changes"""
+
+    UNSET = object()
+
+    def __init__(self, rect, bind, render):
+        self.rect = pygame.Rect(rect)
+        self.bind = bind
+        self.render = render
+        self.value = self.UNSET
+
+
+class Hud:
+    """Retained-mode HUD composed onto one cached Surface.
+
+    Every frame each widget's bind() is polled; only widgets whose value
+    changed are cleared and re-rendered onto the HUD Surface, whose rects
+    are reported as dirty. The composed Surface is blitted once per frame.
+    """
+
+    def __init__(self, widgets):
+        self.widgets = widgets
+        bounds = widgets[0].rect.unionall([widget.rect for widget in widgets[1:]])
+        self.surface = pygame.Surface((bounds.right, bounds.bottom), pygame.SRCALPHA)
+        self.dirty_rects = []
+        self.redraws = 0
+
+    def invalidate(self):
+        for widget in self.widgets:
+            widget.value = HudWidget.UNSET
+
+    def update(self):
+        """Re-render changed widgets; returns their rects in screen space"""
+        dirty = []
+        for widget in self.widgets:
+            value = widget.bind()
+            if value != widget.value:
+                widget.value = value
+                self.surface.fill((0, 0, 0, 0), widget.rect)
+                widget.render(self.surface, value)
+                dirty.append(widget.rect.clip(self.surface.get_rect()))
+        self.redraws += len(dirty)
+        self.dirty_rects = dirty
+        return dirty
+
+    def draw(self, surface):
+        self.update()
+        surface.blit(self.surface, (0, 0))
+        return self.dirty_rects
+
+
+def bar_widget(x, y, w, h, get_value, get_max, color, bg_color, label):
+    """HudWidget for a draw_ui_bar, bound to the shown numbers and fill width"""
+    def bind():
+        value, max_value = get_value(), get_max()
+        return int(value), int(max_value), int((value / max_value) * w)
+
+    def render(surface, state):
+        value, max_value, fill_w = state
+        draw_ui_bar(surface, x, y, w, h, value, max_value, color, bg_color, label, fill_w)
+    return HudWidget((x, y - 18, w, h + 18), bind, render)
+
+
+def spawn_slimes_randomly(map_obj, count=5, rng=random):
     """Spawn slimes in random non-collision areas"""
     slimes = []
-    collision_rects = map_obj.collision_rects
+    collision = map_obj.collision
 
     for _ in range(count):
-        slime_type = random.choice(['red_slime', 'blue_slime', 'yellow_slime'])
+        slime_type = rng.choice(['red_slime', 'blue_slime', 'yellow_slime'])
         max_attempts = 50
 
         for attempt in range(max_attempts):
-            x = random.randint(5, map_obj.width - 5) * map_obj.tile_w
-            y = random.randint(5, map_obj.height - 5) * map_obj.tile_h
+            x = rng.randint(5, map_obj.width - 5) * map_obj.tile_w
+            y = rng.randint(5, map_obj.height - 5) * map_obj.tile_h
 
             test_rect = pygame.Rect(
                 x, y, map_obj.tile_w * 2, map_obj.tile_h * 2)
-            if not any(test_rect.colliderect(r) for r in collision_rects):
-                slime = Slime(x, y, map_obj.tile_w, map_obj.tile_h, slime_type)
+            if not collision.is_blocked(test_rect):
+                slime = Slime(x, y, map_obj.tile_w, map_obj.tile_h, slime_type, rng=rng)
                 slimes.append(slime)
                 break
 
     return slimes
 
 
+class CountingSurface(pygame.Surface):
+    """Back buffer that counts blits and the new surfaces drawn onto it"""
+
+    def __init__(self, size):
+        super().__init__(size)
+        self.blit_count = 0
+        self.new_surfaces = 0
+        # Surfaces seen so far; one that is not here was allocated since
+        # it was last drawn (cached sprites are only counted once)
+        self.seen = weakref.WeakSet()
+
+    def note(self, source):
+        self.blit_count += 1
+        if source not in self.seen:
+            self.seen.add(source)
+            self.new_surfaces += 1
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        self.note(source)
+        return super().blit(source, dest, area, special_flags)
+
+    def blits(self, blit_sequence, doreturn=1):
+        blit_sequence = list(blit_sequence)
+        for item in blit_sequence:
+            self.note(item[0])
+        return super().blits(blit_sequence, doreturn)
+
+    def reset_counts(self):
+        self.blit_count = 0
+        self.new_surfaces = 0
+
+
+class RecordingSurface(CountingSurface):
+    """Counting back buffer that also records where every blit landed, for dirty-rect rendering.
+
+    Blits made while quiet is set (static UI redrawn over itself) go to
+    quiet_rects: they still have the background restored under them next
+    frame but aren't pushed to the display again.
+    """
+
+    def __init__(self, size):
+        super().__init__(size)
+        self.rects = []
+        self.quiet_rects = []
+        self.quiet = False
+
+    def mark(self, rect):
+        if rect.width and rect.height:
+            (self.quiet_rects if self.quiet else self.rects).append(rect)
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        rect = super().blit(source, dest, area, special_flags)
+        self.mark(rect)
+        return rect
+
+    def blits(self, blit_sequence, doreturn=1):
+        rects = super().blits(blit_sequence, 1)
+        for rect in rects:
+            self.mark(rect)
+        return rects if doreturn else None
+
+    def fill(self, color, rect=None, special_flags=0):
+        rect = super().fill(color, rect, special_flags)
+        self.mark(rect)
+        return rect
+
+    def clear_rects(self):
+        self.rects = []
+        self.quiet_rects = []
+
+
+class ProfilerSection:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class FrameProfiler:
+    """Per-frame section timings, blit counts and an optional Chrome trace.
+
+    Sections are timed with `with profiler.section(name):`; when disabled
+    that returns a shared no-op context so the hooks cost next to nothing.
+    Each frame's totals go into a rolling window used for the percentile
+    overlay and the summary. With a trace_path every section is also kept
+    as a Chrome trace event and written out by save_trace(); only the last
+    trace_limit events are kept so long sessions don't grow without bound.
+    """
+
+    NULL_SECTION = contextlib.nullcontext()
+
+    def __init__(self, enabled=False, window=240, trace_path=None, trace_limit=200000):
+        self.enabled = enabled or trace_path is not None
+        self.window = window
+        self.trace_path = trace_path
+        self.trace_events = deque(maxlen=trace_limit)
+        self.samples = {}
+        self.frame_totals = {}
+        self.counters = {'blits': deque(maxlen=window), 'new_surfaces': deque(maxlen=window)}
+        self.show_overlay = False
+        self.canvas_surface = None
+        self.frame_start = None
+        self.frames = 0
+        self.origin = time.perf_counter()
+
+    def reset(self):
+        """Forget the rolling window (the trace is kept)"""
+        self.samples = {}
+        for samples in self.counters.values():
+            samples.clear()
+        self.frames = 0
+
+    def section(self, name):
+        if not self.enabled:
+            return self.NULL_SECTION
+        return ProfilerSection(self, name)
+
+    def record(self, name, start, end):
+        self.frame_totals[name] = self.frame_totals.get(name, 0.0) + (end - start)
+        if self.trace_path:
+            self.trace_events.append({'name': name, 'ph': 'X', 'pid': 1, 'tid': 1,
+                                      'ts': round((start - self.origin) * 1e6, 3),
+                                      'dur': round((end - start) * 1e6, 3)})
+
+    def toggle_overlay(self):
+        self.show_overlay = not self.show_overlay
+        if self.show_overlay:
+            self.enabled = True
+        print(f"Profiler overlay: {self.show_overlay}")
+
+    def canvas(self, screen, surface_class=CountingSurface):
+        """Counting back buffer the size of screen, reused between frames"""
+        if type(self.canvas_surface) is not surface_class or \
+                self.canvas_surface.get_size() != screen.get_size():
+            self.canvas_surface = surface_class(screen.get_size())
+        return self.canvas_surface
+
+    def count(self, name, value):
+        """Add a per-frame count (reported like the draw counts)"""
+        if not self.enabled:
+            return
+        if name not in self.counters:
+            self.counters[name] = deque(maxlen=self.window)
+        self.counters[name].append(value)
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.frame_start = time.perf_counter()
+        self.frame_totals = {}
+        if self.canvas_surface is not None:
+            self.canvas_surface.reset_counts()
+
+    def end_frame(self):
+        if not self.enabled or self.frame_start is None:
+            return
+        end = time.perf_counter()
+        self.record('frame', self.frame_start, end)
+        for name, total in self.frame_totals.items():
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.window)
+            self.samples[name].append(total)
+        if self.canvas_surface is not None:
+            blits = self.canvas_surface.blit_count
+            new_surfaces = self.canvas_surface.new_surfaces
+            self.counters['blits'].append(blits)
+            self.counters['new_surfaces'].append(new_surfaces)
+            if self.trace_path:
+                self.trace_events.append({'name': 'draw counts', 'ph': 'C', 'pid': 1, 'tid': 1,
+                                          'ts': round((end - self.origin) * 1e6, 3),
+                                          'args': {'blits': blits, 'new_surfaces': new_surfaces}})
+        self.frame_start = None
+        self.frames += 1
+
+    def summary(self):
+        """p50/p95/p99 of every section over the window, in ms, plus draw counts"""
+        sections = {}
+        for name, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            sections[name] = {
+                'p50_ms': round(percentile(ordered, 0.50) * 1000, 4),
+                'p95_ms': round(percentile(ordered, 0.95) * 1000, 4),
+                'p99_ms': round(percentile(ordered, 0.99) * 1000, 4),
+            }
+        counts = {}
+        for name, samples in self.counters.items():
+            ordered = sorted(samples)
+            counts[name] = {'p50': percentile(ordered, 0.50), 'max': ordered[-1] if ordered else 0}
+        return {'frames': self.frames, 'sections': sections, 'counts': counts, 'pools': pool_stats()}
+
+    def draw_overlay(self, surface, font):
+        summary = self.summary()
+        lines = [f"{'section':<20}{'p50':>8}{'p95':>8}{'p99':>8}"]
+        for name, stats in summary['sections'].items():
+            lines.append(f"{name:<20}{stats['p50_ms']:>8.2f}{stats['p95_ms']:>8.2f}{stats['p99_ms']:>8.2f}")
+        for name, stats in summary['counts'].items():
+            lines.append(f"{name:<20}{stats['p50']:>8}{'max':>8}{stats['max']:>8}")
+        for name, stats in summary['pools'].items():
+            lines.append(f"{'pool.' + name:<20}{stats['in_use']:>8}{'high':>8}{stats['high_water']:>8}")
+        line_h = font.get_linesize()
+        width = max(font.size(line)[0] for line in lines) + 12
+        x = surface.get_width() - width - 10
+        surface.blit(translucent_panel(width, line_h * len(lines) + 8), (x, 10))
+        for i, line in enumerate(lines):
+            surface.blit(font.render(line, True, (0, 255, 0)), (x + 6, 14 + i * line_h))
+
+    def save_trace(self, path=None):
+        path = path or self.trace_path
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'traceEvents': list(self.trace_events), 'displayTimeUnit': 'ms'}, f)
+            print(f"Wrote {len(self.trace_events)} trace events to {path}")
+        except Exception as e:
+            print(f"Error writing trace {path}: {e}")
+
+
+class AudioManager:
+    """Sound effects and music without stalling the frame.
+
+    Sound effects are decoded on a worker thread the first time they are
+    registered; a sound that is not decoded yet is skipped rather than
+    waited for. play() drops repeats of a sound within one frame and plays
+    at most ``voice_limits[name]`` copies at once, on a fixed pool of
+    channels: when every channel is busy it steals the one playing the
+    lowest-priority (then oldest) sound, if that is below the new sound's
+    priority.
+
+    Music files are read into memory on the worker; once ready, update()
+    fades the current track out and fades the new one in from the buffer.
+    pygame.mixer.music has a single stream, so the crossfade is a fade out
+    followed by a fade in of ``fade_ms`` each.
+    """
+
+    PRIORITIES = {'level_up': 3, 'dying': 3, 'taking_damage': 2, 'attacking': 2, 'projectile': 1}
+    VOICE_LIMITS = {'projectile': 3, 'taking_damage': 2, 'attacking': 2}
+
+    def __init__(self, sound_dir, num_channels=16, volume=0.5, music_volume=0.5, fade_ms=600):
+        self.sound_dir = sound_dir
+        self.volume = volume
+        self.music_volume = music_volume
+        self.fade_ms = fade_ms
+        self.sounds = {}
+        self.loading = {}
+        pygame.mixer.set_num_channels(num_channels)
+        self.channels = [pygame.mixer.Channel(i) for i in range(num_channels)]
+        # What each channel was last given: (sound name, priority, start time)
+        self.channel_info = [None] * num_channels
+        self.played_this_frame = set()
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='audio')
+        self.current_music = None
+        self.pending_music = None
+        self.music_future = None
+        self.music_buffer = None
+        self.fade_until = 0.0
+        self.stats = {'played': 0, 'deduped': 0, 'voice_limited': 0, 'stolen': 0, 'dropped': 0,
+                      'not_ready': 0}
+
+    def sound_path(self, name):
+        for ext in ('wav', 'ogg'):
+            path = os.path.join(self.sound_dir, f'{name}.{ext}')
+            if os.path.exists(path):
+                return path
+        return None
+
+    def decode(self, name, path):
+        sound = pygame.mixer.Sound(path)
+        sound.set_volume(self.volume)
+        return sound
+
+    def load(self, names):
+        """Queue sound effects for background decoding"""
+        for name in names:
+            if name in self.sounds or name in self.loading:
+                continue
+            path = self.sound_path(name)
+            if path is None:
+                print(f"Sound file not found: {name}.wav or {name}.ogg in {self.sound_dir}")
+                self.sounds[name] = None
+            else:
+                self.loading[name] = self.executor.submit(self.decode, name, path)
+
+    def get_sound(self, name):
+        future = self.loading.get(name)
+        if future is not None and future.done():
+            del self.loading[name]
+            try:
+                self.sounds[name] = future.result()
+                print(f"Loaded sound: {name}")
+            except Exception as e:
+                print(f"Error loading sound {name}: {e}")
+                self.sounds[name] = None
+        return self.sounds.get(name)
+
+    def find_channel(self, priority):
+        """A free channel, or the one to steal for a sound of this priority, or None"""
+        victim = None
+        for i, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                return i
+            info = self.channel_info[i]
+            if info is not None and info[1] < priority and \
+                    (victim is None or info[1:] < self.channel_info[victim][1:]):
+                victim = i
+        if victim is not None:
+            self.stats['stolen'] += 1
+        return victim
+
+    def voices(self, name):
+        return sum(1 for i, channel in enumerate(self.channels)
+                   if channel.get_busy() and self.channel_info[i] and self.channel_info[i][0] == name)
+
+    def play(self, name):
+        if name in self.played_this_frame:
+            self.stats['deduped'] += 1
+            return False
+        self.played_this_frame.add(name)
+        sound = self.get_sound(name)
+        if sound is None:
+            if name in self.loading:
+                self.stats['not_ready'] += 1
+            return False
+        if self.voices(name) >= self.VOICE_LIMITS.get(name, 4):
+            self.stats['voice_limited'] += 1
+            return False
+        priority = self.PRIORITIES.get(name, 1)
+        index = self.find_channel(priority)
+        if index is None:
+            self.stats['dropped'] += 1
+            return False
+        self.channels[index].play(sound)
+        self.channel_info[index] = (name, priority, time.perf_counter())
+        self.stats['played'] += 1
+        return True
+
+    def play_music(self, path):
+        """Switch to the track at path once it has been read in the background"""
+        if path == self.pending_music or (path == self.current_music and self.pending_music is None):
+            return
+        if path == self.current_music and self.fade_until == 0.0:
+            # Back to the playing track before the switch got going
+            self.pending_music = None
+            self.music_future = None
+            return
+        self.pending_music = path
+
+        def read():
+            with open(path, 'rb') as f:
+                return f.read()
+        self.music_future = self.executor.submit(read)
+
+    def update(self):
+        """Once per frame: reset deduplication and advance any music switch"""
+        self.played_this_frame.clear()
+        if self.music_future is None or not self.music_future.done():
+            return
+        now = time.perf_counter()
+        if self.fade_until == 0.0 and self.current_music is not None and pygame.mixer.music.get_busy():
+            pygame.mixer.music.fadeout(self.fade_ms)
+            self.fade_until = now + self.fade_ms / 1000
+            return
+        if now < self.fade_until:
+            return
+
+        path = self.pending_music
+        future = self.music_future
+        self.music_future = None
+        self.pending_music = None
+        self.fade_until = 0.0
+        try:
+            self.music_buffer = io.BytesIO(future.result())
+            pygame.mixer.music.load(self.music_buffer, os.path.splitext(path)[1][1:])
+            pygame.mixer.music.set_volume(self.music_volume)
+            pygame.mixer.music.play(-1, fade_ms=self.fade_ms)
+            self.current_music = path
+            print(f"Playing music: {path}")
+        except Exception as e:
+            print(f"Could not load music: {e}")
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class LiveInput:
+    """Input straight from pygame's event queue and keyboard state"""
+
+    def get_events(self):
+        return pygame.event.get()
+
+    def get_pressed(self):
+        return pygame.key.get_pressed()
+
+    def get_mods(self):
+        return pygame.key.get_mods()
+
+    def advance(self, ticks=1):
+        """End of a frame that ran ticks simulation ticks"""
+        pass
+
+    def close(self):
+        pass
+
+
+class KeyState:
+    """Stand-in for pygame.key.get_pressed() built from a set of held keys"""
+
+    def __init__(self, held=()):
+        self.held = frozenset(held)
+
+    def __getitem__(self, key):
+        return key in self.held
+
+
+class ScriptedInput:
+    """Input played back from a script, one entry per frame.
+
+    Each entry is (held_keys, events, mods); events are pygame Events and
+    are handed out by the frame's first get_events() call only, like
+    pygame's queue. After the script runs out every key is released.
+    frame_ticks records how many ticks each frame ran, so a run() session
+    can be repeated through step().
+    """
+
+    def __init__(self, script=None):
+        self.script = list(script or [])
+        self.frame = 0
+        self.events_taken = False
+        self.frame_ticks = []
+
+    def current(self):
+        if self.frame < len(self.script):
+            return self.script[self.frame]
+        return ((), [], 0)
+
+    def get_events(self):
+        if self.events_taken:
+            return []
+        self.events_taken = True
+        return list(self.current()[1])
+
+    def get_pressed(self):
+        return KeyState(self.current()[0])
+
+    def get_mods(self):
+        return self.current()[2]
+
+    def advance(self, ticks=1):
+        self.frame_ticks.append(ticks)
+        self.frame += 1
+        self.events_taken = False
+
+    def close(self):
+        pass
+
+
+class InputRecorder:
+    """Wraps an input source and logs what the game read from it, frame by frame.
+
+    The log is binary: a header (magic, version, seed, flags for settings
+    that change the simulation, map file name) followed by one record per
+    frame that handled events or ran ticks. A record holds a bitmask of the
+    keys the game polls, the modifier state, how many ticks the frame
+    simulated and the QUIT / click / key-down events it handled, plus the
+    view size whenever that changes (it decides what the camera shows and
+    so which entities are simulated at full rate). load_input_log() reads
+    it back for play_input_log().
+    """
+
+    MAGIC = b'RPGI'
+    VERSION = 2
+    HEADER = struct.Struct('<4sHQBH')
+    FLAG_LOD = 1
+    FLAG_RETAIN_MAP_STATE = 2
+    FRAME = struct.Struct('<HHBB')
+    MOUSE = struct.Struct('<Bhh')
+    KEY = struct.Struct('<iH')
+    VIEW = struct.Struct('<HH')
+    EVENT_QUIT, EVENT_MOUSE, EVENT_KEY, EVENT_VIEW = range(4)
+    # Keys read through get_pressed(); everything else arrives as KEYDOWN
+    KEYS = (pygame.K_LSHIFT, pygame.K_RSHIFT, pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP,
+            pygame.K_DOWN, pygame.K_a, pygame.K_d, pygame.K_w, pygame.K_s)
+
+    def __init__(self, source, path, seed, map_name, simulation_lod=False, retain_map_state=False):
+        self.source = source
+        self.path = path
+        self.file = open(path, 'wb')
+        name = map_name.encode('utf-8')
+        flags = (self.FLAG_LOD if simulation_lod else 0) | \
+            (self.FLAG_RETAIN_MAP_STATE if retain_map_state else 0)
+        self.file.write(self.HEADER.pack(self.MAGIC, self.VERSION, seed, flags, len(name)) + name)
+        self.events = []
+        self.keymask = 0
+        self.frame_ticks = 0
+        self.view = None
+        self.ticks = 0
+
+    def flush(self):
+        """Write out the frame that just ended, unless it did nothing"""
+        if not self.events and not self.frame_ticks:
+            return
+        surface = pygame.display.get_surface()
+        if surface is not None and surface.get_size() != self.view:
+            self.view = surface.get_size()
+            self.events.append(bytes([self.EVENT_VIEW]) + self.VIEW.pack(*self.view))
+        self.file.write(self.FRAME.pack(self.keymask, self.source.get_mods() & 0xFFFF,
+                                        self.frame_ticks, len(self.events)) + b''.join(self.events))
+        self.events = []
+        self.frame_ticks = 0
+
+    def get_events(self):
+        events = self.source.get_events()
+        for event in events:
+            if event.type == pygame.QUIT:
+                self.events.append(bytes([self.EVENT_QUIT]))
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                self.events.append(bytes([self.EVENT_MOUSE]) +
+                                   self.MOUSE.pack(event.button, event.pos[0], event.pos[1]))
+            elif event.type == pygame.KEYDOWN:
+                self.events.append(bytes([self.EVENT_KEY]) +
+                                   self.KEY.pack(event.key, getattr(event, 'mod', 0) & 0xFFFF))
+        return events
+
+    def get_pressed(self):
+        keys = self.source.get_pressed()
+        self.keymask = 0
+        for bit, key in enumerate(self.KEYS):
+            if keys[key]:
+                self.keymask |= 1 << bit
+        return keys
+
+    def get_mods(self):
+        return self.source.get_mods()
+
+    def advance(self, ticks=1):
+        self.frame_ticks += ticks
+        self.ticks += ticks
+        self.flush()
+        self.source.advance(ticks)
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+            print(f"Recorded {self.ticks} ticks of input to {self.path}")
+        self.source.close()
+
+
+def load_input_log(path):
+    """Read an InputRecorder log.
+
+    Returns (header, script, ticks): header holds the seed, map file name
+    and the simulation_lod / retain_map_state settings, script has one ScriptedInput entry per
+    recorded frame and ticks how many ticks each of those frames ran.
+    """
+    rec = InputRecorder
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, seed, flags, name_len = rec.HEADER.unpack_from(data, 0)
+    if magic != rec.MAGIC or version != rec.VERSION:
+        raise ValueError(f"{path} is not a version {rec.VERSION} input log")
+    offset = rec.HEADER.size
+    header = {'seed': seed, 'map': data[offset:offset + name_len].decode('utf-8'),
+              'simulation_lod': bool(flags & rec.FLAG_LOD),
+              'retain_map_state': bool(flags & rec.FLAG_RETAIN_MAP_STATE)}
+    offset += name_len
+
+    script = []
+    ticks = []
+    while offset < len(data):
+        keymask, mods, frame_ticks, count = rec.FRAME.unpack_from(data, offset)
+        offset += rec.FRAME.size
+        held = tuple(key for bit, key in enumerate(rec.KEYS) if keymask & (1 << bit))
+        events = []
+        for _ in range(count):
+            kind = data[offset]
+            offset += 1
+            if kind == rec.EVENT_QUIT:
+                events.append(pygame.event.Event(pygame.QUIT))
+            elif kind == rec.EVENT_MOUSE:
+                button, x, y = rec.MOUSE.unpack_from(data, offset)
+                offset += rec.MOUSE.size
+                events.append(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=button, pos=(x, y)))
+            elif kind == rec.EVENT_KEY:
+                key, mod = rec.KEY.unpack_from(data, offset)
+                offset += rec.KEY.size
+                events.append(pygame.event.Event(pygame.KEYDOWN, key=key, mod=mod))
+            elif kind == rec.EVENT_VIEW:
+                w, h = rec.VIEW.unpack_from(data, offset)
+                offset += rec.VIEW.size
+                events.append(pygame.event.Event(pygame.VIDEORESIZE, w=w, h=h, size=(w, h)))
+            else:
+                raise ValueError(f"Unknown event type {kind} in {path}")
+        script.append((held, events, mods))
+        ticks.append(frame_ticks)
+    return header, script, ticks
+
+
 class Game:
-    def __init__(self, tmx_file, fullscreen=True):
+    # Simulation rate in Hz. Speeds, cooldowns and animations are all counted
+    # in ticks, so this is fixed rather than configurable.
+    TICK_RATE = 100
+
+    def __init__(self, tmx_file, fullscreen=True, use_projectile_pool=False, slime_swarm_threshold=64,
+                 render_pacing=100, max_catchup_ticks=5, headless=False, input_source=None,
+                 profiler=None, map_cache=map_cache, prefetch_maps=True, resident_maps=4,
+                 resident_budget_bytes=256 * 1024 * 1024, retain_map_state=False, staged=False,
+                 measure_startup=False, dirty_rects=False, scroll_buffer=True, simulation_lod=False,
+                 seed=None):
+        # Headless runs use SDL's dummy drivers: nothing is shown or heard and
+        # draw() renders off-screen without flipping
+        self.headless = headless
+        if headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+        self.input = input_source or (ScriptedInput() if headless else LiveInput())
+        self.profiler = profiler or FrameProfiler()
+        # Every gameplay roll (spawns, wander, crits, the swarm's generator)
+        # comes from this, so a seed plus the recorded input replays a session
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.rng = random.Random(self.seed)
+        self.startup_start = time.perf_counter()
+        self.startup_times = OrderedDict()
+        self.measure_startup = measure_startup
+
         pygame.init()
         pygame.mixer.init()
 
-        # Load sound effects
-        self.sounds = {}
-        self.load_sounds()
-
         self.default_width = 800
         self.default_height = 600
         self.fullscreen = fullscreen
 
-        if self.fullscreen:
-            self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
-            self.screen_width = self.screen.get_width()
-            self.screen_height = self.screen.get_height()
-        else:
-            self.screen_width = self.default_width
-            self.screen_height = self.default_height
-            self.screen = pygame.display.set_mode(
-                (self.screen_width, self.screen_height))
+        # render_pacing is 'uncapped', 'vsync' or a frame rate cap
+        self.render_pacing = render_pacing
+        self.max_catchup_ticks = max_catchup_ticks
+        self.prev_positions = {}
+        self.prev_camera = None
+
+        # Dirty-rect rendering: while the camera holds still only the regions
+        # drawn this frame or the last are restored from a cached background
+        # and pushed with display.update(); a moving camera redraws everything
+        self.dirty_rendering = dirty_rects
+        self.background = None
+        self.background_key = None
+        self.drawn_rects = []
+        self.quiet_drawn_rects = []
+        # Map-only frame scrolled with the camera, so walking repaints only
+        # the tile strips that come into view
+        self.map_scroll = ScrollBuffer() if scroll_buffer else None
+
+        self.set_display_mode()
 
         pygame.display.set_caption(
             "Medieval RPG - Click to Shoot, SPACE to Attack/Continue, E to Interact")
         self.clock = pygame.time.Clock()
         self.running = True
-
-        self.game_map = GameMap(tmx_file)
-        self.current_map = tmx_file
+        self.startup_times['display'] = time.perf_counter() - self.startup_start
+
+        self.map_cache = map_cache
+        self.start_map = tmx_file
+        # Maps left behind stay resident (with their slimes when
+        # retain_map_state is set) so returning to them is instant
+        self.residency = MapResidency(resident_maps, resident_budget_bytes)
+        self.retain_map_state = retain_map_state
+        self.prefetcher = MapPrefetcher(self.residency, map_cache) if prefetch_maps else None
         self.debug_draw_teleports = False
+        self.use_projectile_pool = use_projectile_pool
+        self.slime_swarm_threshold = slime_swarm_threshold
+        # Far-off slimes, bosses and towers are updated less often or frozen
+        self.lod = SimulationLOD() if simulation_lod is True else simulation_lod or None
+        self.ticks = 0
+
+        # Everything after the display is loaded in stages. A staged game runs
+        # one stage per frame from run() behind a loading screen (a stage that
+        # returns True is called again next frame); otherwise they all run here.
+        self.staged = staged
+        self.startup_stages = deque([
+            ('sounds', self.load_sounds),
+            ('map', self.load_start_map),
+            ('player', self.load_player),
+            ('entities', self.load_entities),
+            ('interface', self.load_interface),
+        ])
+        self.startup_stage_count = len(self.startup_stages)
+        self.stage_started = None
+        self._profiler_font = None
+        if not staged:
+            while self.startup_stages:
+                self.run_startup_stage()
+
+    def run_startup_stage(self):
+        """Run (or continue) the next startup stage, timing it from its first call"""
+        label, stage = self.startup_stages[0]
+        if self.stage_started is None:
+            self.stage_started = time.perf_counter()
+        if not stage():
+            self.startup_stages.popleft()
+            self.startup_times[label] = time.perf_counter() - self.stage_started
+            self.stage_started = None
+
+    def load_start_map(self):
+        """Startup stage: the first map, parsed on the prefetch worker when staged"""
+        self.game_map = None
+        if self.staged and self.prefetcher is not None:
+            self.prefetcher.request(self.start_map)
+            future = self.prefetcher.pending.get(self.prefetcher.key(self.start_map))
+            if future is not None and not future.done():
+                return True
+            self.game_map = self.prefetcher.take(self.start_map)
+        if self.game_map is None:
+            self.game_map = GameMap(self.start_map, cache=self.map_cache, build_entities=False)
+        self.game_map.played = True
+        self.current_map = self.start_map
+        self.prefetch_teleport_destinations()
+        return False
 
+    def load_player(self):
         self.player = Player(166, 57, self.game_map.tile_w,
-                             self.game_map.tile_h)
+                             self.game_map.tile_h, rng=self.rng)
 
         self.teleport_cooldown = 0
         self.teleport_marker_rect = None
         self.teleport_marker_timer = 0
         self.teleport_marker_duration = 300
 
-        # Spawn slimes
-        self.slimes = spawn_slimes_randomly(self.game_map, count=8)
+    def load_entities(self):
+        """Startup stage: tower, boss and NPC images, then the slimes"""
+        self.game_map.finish_loading()
+        self.set_slimes(spawn_slimes_randomly(self.game_map, count=8, rng=self.rng))
 
         self.bosses = self.game_map.bosses
         self.towers = self.game_map.towers
         self.npcs = self.game_map.npcs
 
         self.projectiles = []
+        self.projectile_pool = ProjectilePool() if self.use_projectile_pool and np is not None else None
         self.floating_texts = []
+        self.entity_grid = EntityGrid()
+        self.render_queue = RenderQueue()
 
+    def load_interface(self):
         self.camera = Camera(self.screen_width, self.screen_height,
                              self.game_map.width * self.game_map.tile_w,
                              self.game_map.height * self.game_map.tile_h)
 
-        self.font = pygame.font.Font(None, 24)
+        self.font = text_cache.font(24)
+        self.controls_label = text_cache.label(
+            "WASD: Move | SHIFT: Run | SPACE: Attack | LMB: Shoot | E: Interact/Teleport", 24, (255, 255, 255))
+        self.hud = self.build_hud()
+        self.hud_dirty_rects = []
         self.message = ""
         self.message_timer = 0
 
         self.dialogue = DialogueSystem()
 
-        self.current_music = None
-        self.load_music(tmx_file)
+        self.load_music(self.start_map)
 
         self.nearby_npc = None
 
         self.start_intro_dialogue()
 
+    @property
+    def profiler_font(self):
+        # SysFont scans the system fonts, so only pay for it once the overlay is shown
+        if self._profiler_font is None:
+            self._profiler_font = pygame.font.SysFont('monospace', 14)
+        return self._profiler_font
+
+    def draw_loading_screen(self):
+        """Progress bar over the startup stages still to run"""
+        done = self.startup_stage_count - len(self.startup_stages)
+        self.screen.fill((0, 0, 0))
+        title = text_cache.label("Medieval RPG", 48, (255, 255, 255))
+        self.screen.blit(title, (self.screen_width // 2 - title.get_width() // 2,
+                                 self.screen_height // 2 - 80))
+        label = f"Loading {self.startup_stages[0][0]}..." if self.startup_stages else "Starting..."
+        bar_w = min(400, self.screen_width - 40)
+        draw_ui_bar(self.screen, self.screen_width // 2 - bar_w // 2, self.screen_height // 2,
+                    bar_w, 20, done, self.startup_stage_count, (46, 204, 113), (34, 139, 34), label)
+        if not self.headless:
+            pygame.display.flip()
+
+    def startup_report(self, first_frame, first_loading_frame=None):
+        """Time-to-first-frame for --measure-startup, broken down by stage in ms"""
+        stages = OrderedDict([('imports', self.startup_start - IMPORT_START)])
+        stages.update(self.startup_times)
+        report = {'stages_ms': {label: round(t * 1000, 2) for label, t in stages.items()},
+                  'first_frame_ms': round((first_frame - IMPORT_START) * 1000, 2)}
+        if first_loading_frame is not None:
+            report['first_loading_frame_ms'] = round((first_loading_frame - IMPORT_START) * 1000, 2)
+        return report
+
+    def build_hud(self):
+        """Health/stamina/XP bars, level badge and stats, bound to self.player"""
+        def render_level(surface, level):
+            level_text = text_cache.render(f"Level {level}", 28, (255, 255, 255))
+            surface.blit(translucent_panel(level_text.get_width() + 10, level_text.get_height() + 4),
+                         (220, 10))
+            surface.blit(level_text, (225, 12))
+
+        def render_stats(surface, stats):
+            stats_y = 40
+            for stat_text in (f"DMG: {stats[0]}", f"CRIT: {stats[1]}%"):
+                stat_surf = text_cache.render(stat_text, 20, (200, 200, 200))
+                surface.blit(stat_surf, (225, stats_y))
+                stats_y += 20
+
+        return Hud([
+            bar_widget(10, 10, 200, 25, lambda: self.player.health, lambda: self.player.max_health,
+                       (46, 204, 113), (34, 139, 34), "Health"),
+            bar_widget(10, 50, 200, 20, lambda: self.player.stamina, lambda: self.player.max_stamina,
+                       (241, 196, 15), (150, 100, 0), "Stamina"),
+            bar_widget(10, 85, 200, 15, lambda: self.player.xp, lambda: self.player.xp_to_next_level,
+                       (138, 43, 226), (75, 0, 130), "XP"),
+            HudWidget((220, 10, 120, 28), lambda: self.player.level, render_level),
+            HudWidget((225, 40, 120, 40), lambda: (int(self.player.attack_damage),
+                                                   int(self.player.crit_chance * 100)), render_stats),
+        ])
+
     def start_intro_dialogue(self):
         intro_dialogues = [
             "Welcome, brave warrior! Your journey begins here.",
@@ -1539,7 +4138,7 @@ class Game:
         self.dialogue.start_dialogue(intro_dialogues)
 
     def load_sounds(self):
-        """Load all sound effects"""
+        """Queue all sound effects for background decoding"""
         sound_names = ['projectile', 'attacking',
                        'dying', 'taking_damage', 'level_up']
         sound_dir = os.path.join(os.path.dirname(
@@ -1553,37 +4152,15 @@ class Game:
             except Exception as e:
                 print(f"Could not create sound directory: {e}")
 
-        for sound_name in sound_names:
-            try:
-                sound_path = os.path.join(sound_dir, f'{sound_name}.wav')
-                if os.path.exists(sound_path):
-                    self.sounds[sound_name] = pygame.mixer.Sound(sound_path)
-                    self.sounds[sound_name].set_volume(0.5)
-                    print(f"Loaded sound: {sound_name}.wav")
-                else:
-                    # Try .ogg format
-                    sound_path_ogg = os.path.join(
-                        sound_dir, f'{sound_name}.ogg')
-                    if os.path.exists(sound_path_ogg):
-                        self.sounds[sound_name] = pygame.mixer.Sound(
-                            sound_path_ogg)
-                        self.sounds[sound_name].set_volume(0.5)
-                        print(f"Loaded sound: {sound_name}.ogg")
-                    else:
-                        print(
-                            f"Sound file not found: {sound_path} or {sound_path_ogg}")
-                        self.sounds[sound_name] = None
-            except Exception as e:
-                print(f"Error loading sound {sound_name}: {e}")
-                self.sounds[sound_name] = None
+        self.audio = AudioManager(sound_dir)
+        self.audio.load(sound_names)
 
     def play_sound(self, sound_name):
         """Play a sound effect if it exists"""
-        if sound_name in self.sounds and self.sounds[sound_name]:
-            try:
-                self.sounds[sound_name].play()
-            except Exception as e:
-                print(f"Error playing sound {sound_name}: {e}")
+        try:
+            self.audio.play(sound_name)
+        except Exception as e:
+            print(f"Error playing sound {sound_name}: {e}")
 
     def load_music(self, tmx_file):
         try:
@@ -1591,35 +4168,72 @@ class Game:
             music_path = os.path.join(os.path.dirname(
                 os.path.abspath(__file__)), 'music', f'{map_name}.mp3')
 
-            if os.path.exists(music_path) and music_path != self.current_music:
-                pygame.mixer.music.load(music_path)
-                pygame.mixer.music.set_volume(0.5)
-                pygame.mixer.music.play(-1)
-                self.current_music = music_path
-                print(f"Playing music: {music_path}")
-            elif not os.path.exists(music_path):
+            if os.path.exists(music_path):
+                self.audio.play_music(music_path)
+            else:
                 print(f"Music file not found: {music_path}")
                 generic_music = os.path.join(os.path.dirname(
                     os.path.abspath(__file__)), 'music', 'background.mp3')
-                if os.path.exists(generic_music) and generic_music != self.current_music:
-                    pygame.mixer.music.load(generic_music)
-                    pygame.mixer.music.set_volume(0.5)
-                    pygame.mixer.music.play(-1)
-                    self.current_music = generic_music
-                    print(f"Playing generic music: {generic_music}")
+                if os.path.exists(generic_music):
+                    self.audio.play_music(generic_music)
         except Exception as e:
             print(f"Could not load music: {e}")
 
+    def set_slimes(self, slimes):
+        """Replace the slime list, batching it through a SlimeSwarm when it is large"""
+        self.slimes = slimes
+        if np is not None and self.slime_swarm_threshold is not None and \
+                len(slimes) >= self.slime_swarm_threshold:
+            self.slime_swarm = SlimeSwarm(slimes, seed=self.rng.getrandbits(64))
+        else:
+            self.slime_swarm = None
+
+    def resolve_teleport_dest(self, dest):
+        """Path of a teleport's destination map, or None if it does not exist"""
+        if not dest:
+            return None
+        base_dir = os.path.dirname(os.path.abspath(
+            self.current_map)) if self.current_map else os.path.dirname(os.path.abspath(__file__))
+        dest_path = dest if os.path.isabs(
+            dest) else os.path.join(base_dir, dest)
+        if not os.path.exists(dest_path):
+            alt = os.path.join(os.path.dirname(
+                os.path.abspath(__file__)), 'map', dest)
+            if os.path.exists(alt):
+                dest_path = alt
+        return dest_path if os.path.exists(dest_path) else None
+
+    def prefetch_teleport_destinations(self):
+        if self.prefetcher is None:
+            return
+        for tp in getattr(self.game_map, 'teleports', []):
+            dest_path = self.resolve_teleport_dest(tp.get('dest'))
+            if dest_path and os.path.abspath(dest_path) != os.path.abspath(self.current_map):
+                self.prefetcher.request(dest_path)
+
     def load_map(self, tmx_file, teleport_obj=None):
+        resident_state = None
         try:
-            new_map = GameMap(tmx_file)
+            resident = self.residency.take(tmx_file)
+            if resident is not None:
+                new_map, resident_state = resident
+                if new_map.played and not self.retain_map_state:
+                    new_map.reset_entities()
+            else:
+                new_map = self.prefetcher.take(tmx_file) if self.prefetcher is not None else None
+                if new_map is None:
+                    new_map = GameMap(tmx_file, cache=self.map_cache)
         except Exception as e:
             self.message = f"Failed to load map: {os.path.basename(tmx_file)}"
             self.message_timer = 60
             print(f"load_map error: {e}")
             return
 
+        if self.current_map:
+            state = {'slimes': self.slimes} if self.retain_map_state else None
+            self.residency.put(self.current_map, self.game_map, state)
         self.game_map = new_map
+        self.game_map.played = True
         self.current_map = tmx_file
 
         try:
@@ -1675,10 +4289,12 @@ class Game:
         self.player.pixel_y = max(0, min(self.player.pixel_y, max_y))
 
         map_name = os.path.basename(tmx_file).lower()
-        if map_name != "home_inn_1.tmx":
-            self.slimes = spawn_slimes_randomly(self.game_map, count=8)
+        if resident_state is not None:
+            self.set_slimes(resident_state['slimes'])
+        elif map_name != "home_inn_1.tmx":
+            self.set_slimes(spawn_slimes_randomly(self.game_map, count=8, rng=self.rng))
         else:
-            self.slimes = []
+            self.set_slimes([])
 
         self.bosses = self.game_map.bosses
         self.towers = self.game_map.towers
@@ -1698,38 +4314,58 @@ class Game:
             pass
 
         self.load_music(tmx_file)
-
-    def toggle_fullscreen(self):
-        self.fullscreen = not self.fullscreen
+        # Don't interpolate across the teleport
+        self.snapshot_positions()
+        self.prefetch_teleport_destinations()
+
+    def set_display_mode(self):
+        flags = 0
+        vsync = 0
+        if self.render_pacing == 'vsync':
+            # SDL only honours vsync for SCALED/OPENGL windows
+            flags |= pygame.SCALED
+            vsync = 1
         if self.fullscreen:
-            self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+            self.screen = pygame.display.set_mode(
+                (0, 0), flags | pygame.FULLSCREEN, vsync=vsync)
             self.screen_width = self.screen.get_width()
             self.screen_height = self.screen.get_height()
         else:
             self.screen_width = self.default_width
             self.screen_height = self.default_height
             self.screen = pygame.display.set_mode(
-                (self.screen_width, self.screen_height))
+                (self.screen_width, self.screen_height), flags, vsync=vsync)
+
+    def toggle_fullscreen(self):
+        self.fullscreen = not self.fullscreen
+        self.set_display_mode()
         self.camera.update_screen_size(self.screen_width, self.screen_height)
 
     def handle_events(self):
         self.teleport_ready = None
-        for event in pygame.event.get():
+        for event in self.input.get_events():
             if event.type == pygame.QUIT:
                 self.running = False
+            elif event.type == pygame.VIDEORESIZE and isinstance(self.input, ScriptedInput):
+                # Input playback sizes the view to match the recorded session;
+                # live ones (e.g. from a fullscreen toggle) are left alone
+                if (event.w, event.h) != (self.screen_width, self.screen_height):
+                    self.screen_width, self.screen_height = event.w, event.h
+                    self.screen = pygame.display.set_mode((event.w, event.h))
+                    self.camera.update_screen_size(event.w, event.h)
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:
                     if not self.dialogue.active:
-                        mouse_x, mouse_y = pygame.mouse.get_pos()
+                        mouse_x, mouse_y = event.pos
                         world_x = mouse_x + self.camera.x
                         world_y = mouse_y + self.camera.y
                         projectile, is_crit = self.player.shoot_projectile(
                             world_x, world_y)
                         if projectile:
-                            self.projectiles.append(projectile)
+                            self.add_projectile(projectile)
                             self.play_sound('projectile')
                             if is_crit:
-                                self.floating_texts.append(FloatingText(
+                                self.floating_texts.append(FloatingText.pool.acquire(
                                     self.player.pixel_x + self.player.tile_w // 2,
                                     self.player.pixel_y,
                                     "Critical!",
@@ -1741,7 +4377,10 @@ class Game:
                         self, 'debug_draw_teleports', False)
                     print(f"Debug draw teleports: {self.debug_draw_teleports}")
                     return
-                if event.key == pygame.K_F11 or (event.key == pygame.K_RETURN and (pygame.key.get_mods() & pygame.KMOD_ALT)):
+                if event.key == pygame.K_F3:
+                    self.profiler.toggle_overlay()
+                    return
+                if event.key == pygame.K_F11 or (event.key == pygame.K_RETURN and (self.input.get_mods() & pygame.KMOD_ALT)):
                     self.toggle_fullscreen()
                 elif event.key == pygame.K_ESCAPE:
                     if self.fullscreen:
@@ -1777,295 +4416,527 @@ class Game:
                                              self.player.tile_w, self.player.tile_h)
                         for tp in getattr(self.game_map, 'teleports', []):
                             if tp.get('rect') and p_rect.colliderect(tp['rect']):
-                                dest = tp.get('dest')
-                                if dest:
-                                    base_dir = os.path.dirname(os.path.abspath(
-                                        self.current_map)) if self.current_map else os.path.dirname(os.path.abspath(__file__))
-                                    dest_path = dest if os.path.isabs(
-                                        dest) else os.path.join(base_dir, dest)
-                                    if not os.path.exists(dest_path):
-                                        alt = os.path.join(os.path.dirname(
-                                            os.path.abspath(__file__)), 'map', dest)
-                                        if os.path.exists(alt):
-                                            dest_path = alt
-                                    if os.path.exists(dest_path):
-                                        self.load_map(dest_path, tp)
-                                        self.teleport_cooldown = 30
-                                        break
+                                dest_path = self.resolve_teleport_dest(tp.get('dest'))
+                                if dest_path:
+                                    self.load_map(dest_path, tp)
+                                    self.teleport_cooldown = 30
+                                    break
 
     def update(self):
-        keys = pygame.key.get_pressed()
-        self.player.handle_input(keys, self.game_map.collision_rects,
-                                 self.game_map.width, self.game_map.height)
-
-        self.player.update_combat()
-
-        for slime in self.slimes:
-            slime.update(self.player, self.game_map.collision_rects,
-                         self.game_map.width, self.game_map.height, self)
-
-        for boss in self.bosses:
-            projectile = boss.update(self.player)
-            if projectile:
-                self.projectiles.append(projectile)
-
-        for tower in self.towers:
-            projectile = tower.update(self.player)
-            if projectile:
-                self.projectiles.append(projectile)
-
-        # Check for nearby NPCs
-        self.nearby_npc = None
-        for npc in self.npcs:
-            if npc.can_interact(self.player):
-                self.nearby_npc = npc
-                break
-
-        for proj in self.projectiles[:]:
-            proj.update()
-
-            if proj.is_enemy:
-                player_rect = pygame.Rect(self.player.pixel_x, self.player.pixel_y,
-                                          self.player.tile_w, self.player.tile_h)
-                if proj.rect.colliderect(player_rect) and self.player.state != State.DEAD:
-                    self.player.take_damage(proj.damage)
-                    self.play_sound('taking_damage')
-                    proj.active = False
+        prof = self.profiler
+        self.ticks += 1
+        lod = self.lod
+        if lod is not None:
+            lod.begin(self.player, self.camera, self.ticks)
+        with prof.section('update.player'):
+            keys = self.input.get_pressed()
+            self.player.handle_input(keys, self.game_map.collision,
+                                     self.game_map.width, self.game_map.height)
+
+            self.player.update_combat()
+
+        with prof.section('update.slimes'):
+            if self.slime_swarm is not None:
+                active = lod.swarm_mask(self.slime_swarm) if lod is not None else None
+                self.slime_swarm.step(self.player, self.game_map.collision,
+                                      self.game_map.width, self.game_map.height, self, active)
             else:
-                for slime in self.slimes:
-                    if slime.state != State.DEAD:
-                        slime_rect = pygame.Rect(slime.pixel_x, slime.pixel_y,
-                                                 slime.tile_w, slime.tile_h)
-                        if proj.rect.colliderect(slime_rect):
-                            is_crit = random.random() < self.player.crit_chance
-                            damage = proj.damage * self.player.crit_multiplier if is_crit else proj.damage
-                            died, xp_reward = slime.take_damage(
-                                damage, is_crit)
-                            if died:
-                                self.player.gain_xp(xp_reward, self)
-                            if is_crit:
-                                self.floating_texts.append(FloatingText(
-                                    slime.pixel_x + slime.tile_w // 2,
-                                    slime.pixel_y,
-                                    "Critical!",
-                                    (255, 0, 0)
-                                ))
-                            proj.active = False
-                            break
+                for i, slime in enumerate(self.slimes):
+                    if lod is None or lod.should_update(slime, i):
+                        slime.update(self.player, self.game_map.collision,
+                                     self.game_map.width, self.game_map.height, self)
+
+        with prof.section('update.bosses'):
+            for i, boss in enumerate(self.bosses):
+                if lod is None or lod.should_update(boss, i):
+                    projectile = boss.update(self.player)
+                    if projectile:
+                        self.add_projectile(projectile)
+
+        with prof.section('update.towers'):
+            for i, tower in enumerate(self.towers):
+                if lod is None or lod.should_update(tower, i):
+                    projectile = tower.update(self.player)
+                    if projectile:
+                        self.add_projectile(projectile)
+            if lod is not None and prof.enabled:
+                for name, value in lod.stats().items():
+                    prof.count('lod.' + name, value)
+
+        with prof.section('update.npcs'):
+            # Check for nearby NPCs
+            self.nearby_npc = None
+            for npc in self.npcs:
+                if npc.can_interact(self.player):
+                    self.nearby_npc = npc
+                    break
 
-                for boss in self.bosses:
-                    if boss.state != State.DEAD:
-                        boss_rect = pygame.Rect(boss.pixel_x, boss.pixel_y,
-                                                boss.render_w, boss.render_h)
-                        if proj.rect.colliderect(boss_rect):
-                            is_crit = random.random() < self.player.crit_chance
-                            damage = proj.damage * self.player.crit_multiplier if is_crit else proj.damage
-                            died, xp_reward = boss.take_damage(damage, is_crit)
-                            if died:
-                                self.player.gain_xp(xp_reward, self)
-                            if is_crit:
-                                self.floating_texts.append(FloatingText(
-                                    boss.pixel_x + boss.render_w // 2,
-                                    boss.pixel_y,
-                                    "Critical!",
-                                    (255, 0, 0)
-                                ))
-                            proj.active = False
-                            break
+        with prof.section('update.projectiles'):
+            self.entity_grid.rebuild((self.slimes, self.bosses, self.towers))
+            player_rect = pygame.Rect(self.player.pixel_x, self.player.pixel_y,
+                                      self.player.tile_w, self.player.tile_h)
 
-                for tower in self.towers:
-                    if tower.state != State.DEAD:
-                        tower_rect = pygame.Rect(tower.pixel_x, tower.pixel_y,
-                                                 tower.render_w, tower.render_h)
-                        if proj.rect.colliderect(tower_rect):
-                            is_crit = random.random() < self.player.crit_chance
-                            damage = proj.damage * self.player.crit_multiplier if is_crit else proj.damage
-                            died, xp_reward = tower.take_damage(
-                                damage, is_crit)
-                            if died:
-                                self.player.gain_xp(xp_reward, self)
-                            if is_crit:
-                                self.floating_texts.append(FloatingText(
-                                    tower.pixel_x + tower.render_w // 2,
-                                    tower.pixel_y,
-                                    "Critical!",
-                                    (255, 0, 0)
-                                ))
+            if self.projectile_pool is not None:
+                self.update_projectile_pool(player_rect)
+            else:
+                map_w = self.game_map.width * self.game_map.tile_w
+                map_h = self.game_map.height * self.game_map.tile_h
+                for proj in self.projectiles:
+                    proj.update()
+
+                    if proj.is_enemy:
+                        if proj.rect.colliderect(player_rect) and self.player.state != State.DEAD:
+                            self.player.take_damage(proj.damage)
+                            self.play_sound('taking_damage')
                             proj.active = False
-                            break
-
-            if not proj.active or proj.x < 0 or proj.x > self.game_map.width * self.game_map.tile_w or \
-               proj.y < 0 or proj.y > self.game_map.height * self.game_map.tile_h:
-                self.projectiles.remove(proj)
-
-        for text in self.floating_texts[:]:
-            text.update()
-            if not text.is_alive():
-                self.floating_texts.remove(text)
-
-        self.camera.update(self.player.pixel_x, self.player.pixel_y,
-                           self.player.tile_w, self.player.tile_h)
-
-        self.teleport_ready = None
-        if getattr(self, 'teleport_cooldown', 0) > 0:
-            self.teleport_cooldown -= 1
-        else:
-            p_rect = pygame.Rect(self.player.pixel_x, self.player.pixel_y,
-                                 self.player.tile_w, self.player.tile_h)
-            for tp in getattr(self.game_map, 'teleports', []):
-                if tp.get('rect') and p_rect.colliderect(tp['rect']):
-                    self.teleport_ready = tp
-                    break
+                    else:
+                        hit_group = None
+                        for group, _, entity in self.entity_grid.query(proj.rect):
+                            if group != hit_group and entity.state != State.DEAD and \
+                                    proj.rect.colliderect(entity.hitbox):
+                                self.hit_entity(entity, proj.damage)
+                                proj.active = False
+                                hit_group = group
+
+                    if proj.x < 0 or proj.x > map_w or proj.y < 0 or proj.y > map_h:
+                        proj.active = False
+                compact_live(self.projectiles, Projectile.pool)
+
+        with prof.section('update.texts'):
+            for text in self.floating_texts:
+                text.update()
+            compact_live(self.floating_texts, FloatingText.pool)
+
+        with prof.section('update.camera'):
+            self.camera.update(self.player.pixel_x, self.player.pixel_y,
+                               self.player.tile_w, self.player.tile_h)
+
+        with prof.section('update.teleport'):
+            self.teleport_ready = None
+            if getattr(self, 'teleport_cooldown', 0) > 0:
+                self.teleport_cooldown -= 1
+            else:
+                p_rect = pygame.Rect(self.player.pixel_x, self.player.pixel_y,
+                                     self.player.tile_w, self.player.tile_h)
+                for tp in getattr(self.game_map, 'teleports', []):
+                    if tp.get('rect') and p_rect.colliderect(tp['rect']):
+                        self.teleport_ready = tp
+                        break
 
         if self.message_timer > 0:
             self.message_timer -= 1
 
-        all_dead = all(s.state == State.DEAD for s in self.slimes) and \
-            all(b.state == State.DEAD for b in self.bosses) and \
-            all(t.state == State.DEAD for t in self.towers)
-
-        if all_dead and len(self.slimes + self.bosses + self.towers) > 0 and self.teleport_marker_timer == 0:
-            tps = getattr(self.game_map, 'teleports', [])
-            if tps:
-                tp = tps[0]
-                self.teleport_marker_rect = tp.get('rect')
-                self.teleport_marker_timer = self.teleport_marker_duration
-
-        if self.teleport_marker_timer > 0:
-            self.teleport_marker_timer -= 1
-            if self.teleport_marker_timer == 0:
-                self.teleport_marker_rect = None
-
-    def draw(self):
-        self.screen.fill((0, 0, 0))
-        self.game_map.draw(self.screen, self.camera.x, self.camera.y)
-
-        for npc in self.npcs:
-            npc.draw(self.screen, self.camera.x, self.camera.y)
-
-        for slime in self.slimes:
-            slime.draw(self.screen, self.camera.x, self.camera.y)
-
-        for boss in self.bosses:
-            boss.draw(self.screen, self.camera.x, self.camera.y)
-
-        for tower in self.towers:
-            tower.draw(self.screen, self.camera.x, self.camera.y)
-
-        self.player.draw(self.screen, self.camera.x, self.camera.y)
+        with prof.section('update.marker'):
+            all_dead = all(s.state == State.DEAD for s in self.slimes) and \
+                all(b.state == State.DEAD for b in self.bosses) and \
+                all(t.state == State.DEAD for t in self.towers)
+
+            if all_dead and len(self.slimes + self.bosses + self.towers) > 0 and self.teleport_marker_timer == 0:
+                tps = getattr(self.game_map, 'teleports', [])
+                if tps:
+                    tp = tps[0]
+                    self.teleport_marker_rect = tp.get('rect')
+                    self.teleport_marker_timer = self.teleport_marker_duration
+
+            if self.teleport_marker_timer > 0:
+                self.teleport_marker_timer -= 1
+                if self.teleport_marker_timer == 0:
+                    self.teleport_marker_rect = None
+
+    def add_projectile(self, projectile):
+        if self.projectile_pool is not None:
+            # The pool copies what it needs, so the object can go straight back
+            self.projectile_pool.add(projectile)
+            Projectile.pool.release(projectile)
+        else:
+            self.projectiles.append(projectile)
+
+    def update_projectile_pool(self, player_rect):
+        """Vectorized equivalent of the per-Projectile update loop"""
+        pool = self.projectile_pool
+        pool.integrate()
+        n = pool.count
+        if n:
+            left, top = pool.rect_topleft()
+            is_enemy = pool.is_enemy[:n]
+            hits_player = is_enemy & pool.overlaps(left, top, player_rect)
+
+            # Only friendly projectiles in an occupied grid cell get exact
+            # Rect tests, against the entities EntityGrid.query() returns
+            friendly = np.flatnonzero(~is_enemy)
+            near = friendly[self.entity_grid.touches(left[friendly], top[friendly], pool.SIZE)]
+            candidates = set(np.flatnonzero(hits_player).tolist()) | set(near.tolist())
+
+            # Resolve hits in projectile order like the object loop: crit rolls
+            # and level-up heals depend on the order hits land in
+            size = pool.SIZE
+            for i in sorted(candidates):
+                if hits_player[i]:
+                    if self.player.state != State.DEAD:
+                        self.player.take_damage(pool.damage[i])
+                        self.play_sound('taking_damage')
+                        pool.active[i] = False
+                    continue
+                rect = pygame.Rect(int(left[i]), int(top[i]), size, size)
+                hit_group = None
+                for group, _, entity in self.entity_grid.query(rect):
+                    if group != hit_group and entity.state != State.DEAD and \
+                            rect.colliderect(entity.hitbox):
+                        self.hit_entity(entity, pool.damage[i])
+                        pool.active[i] = False
+                        hit_group = group
+
+        pool.compact(self.game_map.width * self.game_map.tile_w,
+                     self.game_map.height * self.game_map.tile_h)
+
+    def hit_entity(self, entity, damage):
+        """Apply a player projectile hit to a slime, boss or tower"""
+        is_crit = self.rng.random() < self.player.crit_chance
+        damage = damage * self.player.crit_multiplier if is_crit else damage
+        died, xp_reward = entity.take_damage(damage, is_crit)
+        if died:
+            self.player.gain_xp(xp_reward, self)
+        if is_crit:
+            self.floating_texts.append(FloatingText.pool.acquire(
+                entity.pixel_x + entity.hitbox.width // 2,
+                entity.pixel_y,
+                "Critical!",
+                (255, 0, 0)
+            ))
 
-        for proj in self.projectiles:
-            proj.draw(self.screen, self.camera.x, self.camera.y)
+    def snapshot_positions(self):
+        """Remember where moving things are at the start of a tick for interpolation"""
+        self.prev_positions = {id(e): (e.pixel_x, e.pixel_y)
+                               for e in [self.player] + self.slimes}
+        self.prev_camera = (self.camera.x, self.camera.y)
+
+    def state_checksum(self):
+        """SHA-1 over the simulated state, for checking that a replay matches its recording"""
+        p = self.player
+        state = [os.path.basename(self.current_map or ''), self.ticks,
+                 (p.pixel_x, p.pixel_y, p.health, p.stamina, p.level, p.xp, p.total_xp),
+                 (self.camera.x, self.camera.y)]
+        for group in (self.slimes, self.bosses, self.towers):
+            state.append([(type(e).__name__, e.pixel_x, e.pixel_y, getattr(e, 'health', None))
+                          for e in group])
+        projectiles = len(self.projectile_pool) if self.projectile_pool is not None else len(self.projectiles)
+        state.append((projectiles, len(self.floating_texts)))
+        return hashlib.sha1(repr(state).encode('utf-8')).hexdigest()
+
+    def interpolated_camera(self, entity, cam_x, cam_y, alpha):
+        """Camera offset that draws entity at its position interpolated between ticks"""
+        prev = self.prev_positions.get(id(entity))
+        if prev is None:
+            return cam_x, cam_y
+        return (cam_x + (entity.pixel_x - prev[0]) * (1 - alpha),
+                cam_y + (entity.pixel_y - prev[1]) * (1 - alpha))
+
+    def draw(self, alpha=1.0):
+        """Draw the world; alpha is how far the frame is between the last two ticks"""
+        cam_x, cam_y = self.camera.x, self.camera.y
+        if alpha < 1.0 and self.prev_camera is not None:
+            cam_x = self.prev_camera[0] + (cam_x - self.prev_camera[0]) * alpha
+            cam_y = self.prev_camera[1] + (cam_y - self.prev_camera[1]) * alpha
+        else:
+            alpha = 1.0
+        lag = 1 - alpha
+
+        # While profiling, draw into a counting back buffer so blits and
+        # new surfaces can be tallied, then copy it to the display
+        prof = self.profiler
+        dirty = self.dirty_rendering
+        if dirty:
+            screen = prof.canvas(self.screen, RecordingSurface)
+        else:
+            screen = prof.canvas(self.screen) if prof.enabled else self.screen
 
-        for text in self.floating_texts:
-            text.draw(self.screen, self.camera.x, self.camera.y)
+        with prof.section('draw.map'):
+            if dirty:
+                full_redraw = self.restore_background(screen, cam_x, cam_y)
+            else:
+                self.draw_map(screen, cam_x, cam_y)
+
+        with prof.section('draw.entities'):
+            queue = self.render_queue
+            queue.begin(screen.get_rect())
+            # Entities well outside the view aren't rendered at all; the
+            # margin covers interpolation, health bars and name tags
+            view = pygame.Rect(cam_x - 64, cam_y - 64, screen.get_width() + 128, screen.get_height() + 128)
+            for npc in self.npcs:
+                if self.in_view(npc, view):
+                    npc.render(queue, cam_x, cam_y)
+
+            for slime in self.slimes:
+                if self.in_view(slime, view):
+                    slime.render(queue, *self.interpolated_camera(slime, cam_x, cam_y, alpha))
+
+            for boss in self.bosses:
+                if self.in_view(boss, view):
+                    boss.render(queue, cam_x, cam_y)
+
+            for tower in self.towers:
+                if self.in_view(tower, view):
+                    tower.render(queue, cam_x, cam_y)
+
+            self.player.render(queue, *self.interpolated_camera(self.player, cam_x, cam_y, alpha))
+
+            if self.projectile_pool is not None:
+                self.projectile_pool.render(queue, cam_x, cam_y, lag)
+            for proj in self.projectiles:
+                proj.render(queue, cam_x + proj.vel_x * lag, cam_y + proj.vel_y * lag)
+
+            for text in self.floating_texts:
+                text.render(queue, cam_x, cam_y + text.vel_y * lag)
+
+            queue.flush(screen)
+            if prof.enabled:
+                for name, value in queue.stats().items():
+                    prof.count('queue.' + name, value)
+
+            if getattr(self, 'debug_draw_teleports', False):
+                for tp in getattr(self.game_map, 'teleports', []):
+                    try:
+                        r = tp.get('rect')
+                        if r:
+                            sx = r.x - cam_x
+                            sy = r.y - cam_y
+                            rect = pygame.draw.rect(
+                                screen, (0, 255, 255), (sx, sy, r.width, r.height), 2)
+                            if dirty:
+                                screen.mark(rect)
+                            lbl = text_cache.render(str(tp.get('dest')), 24, (0, 255, 255))
+                            screen.blit(lbl, (sx, sy - 18))
+                    except Exception:
+                        pass
 
-        if getattr(self, 'debug_draw_teleports', False):
-            for tp in getattr(self.game_map, 'teleports', []):
+            if getattr(self, 'teleport_marker_rect', None) and getattr(self, 'teleport_marker_timer', 0) > 0:
                 try:
-                    r = tp.get('rect')
-                    if r:
-                        sx = r.x - self.camera.x
-                        sy = r.y - self.camera.y
-                        pygame.draw.rect(
-                            self.screen, (0, 255, 255), (sx, sy, r.width, r.height), 2)
-                        lbl = self.font.render(
-                            str(tp.get('dest')), True, (0, 255, 255))
-                        self.screen.blit(lbl, (sx, sy - 18))
+                    tp = self.teleport_marker_rect
+                    sx = int(tp.centerx - cam_x)
+                    sy = int(tp.top - cam_y) - 24
+                    pulse = 1.0 + 0.2 * \
+                        (1 + math.sin(self.teleport_marker_timer * 0.2))
+                    arrow_h = int(16 * pulse)
+                    arrow_w = int(12 * pulse)
+                    points = [(sx, sy), (sx - arrow_w, sy + arrow_h),
+                              (sx + arrow_w, sy + arrow_h)]
+                    rect = pygame.draw.polygon(screen, (255, 215, 0), points)
+                    if dirty:
+                        screen.mark(rect)
+                    label = text_cache.label("TELEPORT", 24, (255, 215, 0))
+                    screen.blit(label, (sx - label.get_width() // 2, sy - 18))
                 except Exception:
                     pass
 
-        if getattr(self, 'teleport_marker_rect', None) and getattr(self, 'teleport_marker_timer', 0) > 0:
-            try:
-                tp = self.teleport_marker_rect
-                sx = int(tp.centerx - self.camera.x)
-                sy = int(tp.top - self.camera.y) - 24
-                pulse = 1.0 + 0.2 * \
-                    (1 + math.sin(self.teleport_marker_timer * 0.2))
-                arrow_h = int(16 * pulse)
-                arrow_w = int(12 * pulse)
-                points = [(sx, sy), (sx - arrow_w, sy + arrow_h),
-                          (sx + arrow_w, sy + arrow_h)]
-                pygame.draw.polygon(self.screen, (255, 215, 0), points)
-                label = self.font.render("TELEPORT", True, (255, 215, 0))
-                self.screen.blit(label, (sx - label.get_width() // 2, sy - 18))
-            except Exception:
-                pass
-
-        draw_ui_bar(self.screen, 10, 10, 200, 25, self.player.health,
-                    self.player.max_health, (46, 204, 113), (34, 139, 34), "Health")
-        draw_ui_bar(self.screen, 10, 50, 200, 20, self.player.stamina,
-                    self.player.max_stamina, (241, 196, 15), (150, 100, 0), "Stamina")
-
-        # Draw XP bar
-        draw_ui_bar(self.screen, 10, 85, 200, 15, self.player.xp,
-                    self.player.xp_to_next_level, (138, 43, 226), (75, 0, 130), "XP")
-
-        # Draw level indicator
-        level_font = pygame.font.Font(None, 28)
-        level_text = level_font.render(
-            f"Level {self.player.level}", True, (255, 255, 255))
-        level_bg = pygame.Surface(
-            (level_text.get_width() + 10, level_text.get_height() + 4))
-        level_bg.set_alpha(180)
-        level_bg.fill((0, 0, 0))
-        self.screen.blit(level_bg, (220, 10))
-        self.screen.blit(level_text, (225, 12))
-
-        # Draw stats info
-        stats_font = pygame.font.Font(None, 20)
-        stats_y = 40
-        stats_info = [
-            f"DMG: {int(self.player.attack_damage)}",
-            f"CRIT: {int(self.player.crit_chance * 100)}%"
-        ]
-        for stat_text in stats_info:
-            stat_surf = stats_font.render(stat_text, True, (200, 200, 200))
-            self.screen.blit(stat_surf, (225, stats_y))
-            stats_y += 20
-
-        controls = self.font.render(
-            "WASD: Move | SHIFT: Run | SPACE: Attack | LMB: Shoot | E: Interact/Teleport", True, (255, 255, 255))
-        self.screen.blit(controls, (10, self.screen_height - 30))
-
-        if getattr(self, 'teleport_ready', None):
-            prompt = self.font.render(
-                "Press E to teleport", True, (0, 255, 255))
-            self.screen.blit(prompt, (self.screen_width //
-                             2 - prompt.get_width() // 2, 70))
-
-        if self.nearby_npc and not self.dialogue.active:
-            prompt = self.font.render(
-                f"Press E to talk to {self.nearby_npc.npc_name}", True, (255, 255, 100))
-            self.screen.blit(prompt, (self.screen_width //
-                             2 - prompt.get_width() // 2, 90))
-
-        if self.message_timer > 0:
-            msg_surf = self.font.render(self.message, True, (255, 255, 0))
-            self.screen.blit(msg_surf, (self.screen_width //
-                             2 - msg_surf.get_width() // 2, 100))
-
-        if self.player.state == State.DEAD:
-            game_over_font = pygame.font.Font(None, 72)
-            game_over_surf = game_over_font.render(
-                "YOU DIED!", True, (255, 0, 0))
-            self.screen.blit(game_over_surf, (self.screen_width // 2 - game_over_surf.get_width() // 2,
-                                              self.screen_height // 2))
-
-        self.dialogue.draw(self.screen, self.screen_width, self.screen_height)
-
-        pygame.display.flip()
+        with prof.section('draw.ui'):
+            if dirty:
+                # Only the HUD's changed widgets need to reach the display
+                screen.quiet = True
+            self.hud_dirty_rects = self.hud.draw(screen)
+
+            screen.blit(self.controls_label, (10, self.screen_height - 30))
+            if dirty:
+                screen.quiet = False
+
+            if getattr(self, 'teleport_ready', None):
+                prompt = text_cache.label("Press E to teleport", 24, (0, 255, 255))
+                screen.blit(prompt, (self.screen_width //
+                                     2 - prompt.get_width() // 2, 70))
+
+            if self.nearby_npc and not self.dialogue.active:
+                prompt = text_cache.label(f"Press E to talk to {self.nearby_npc.npc_name}", 24, (255, 255, 100))
+                screen.blit(prompt, (self.screen_width //
+                                     2 - prompt.get_width() // 2, 90))
+
+            if self.message_timer > 0:
+                msg_surf = text_cache.render(self.message, 24, (255, 255, 0))
+                screen.blit(msg_surf, (self.screen_width //
+                                       2 - msg_surf.get_width() // 2, 100))
+
+            if self.player.state == State.DEAD:
+                game_over_surf = text_cache.label("YOU DIED!", 72, (255, 0, 0))
+                screen.blit(game_over_surf, (self.screen_width // 2 - game_over_surf.get_width() // 2,
+                                             self.screen_height // 2))
+
+            self.dialogue.draw(screen, self.screen_width, self.screen_height)
+
+        update_rects = None
+        if dirty:
+            update_rects = self.present_dirty_rects(screen, full_redraw)
+        elif screen is not self.screen:
+            self.screen.blit(screen, (0, 0))
+        if prof.show_overlay:
+            prof.draw_overlay(self.screen, self.profiler_font)
+
+        if not self.headless:
+            if update_rects is None:
+                pygame.display.flip()
+            else:
+                pygame.display.update(update_rects)
+
+    def in_view(self, entity, view):
+        """Whether entity's sprite rect touches view; counts it as culled if not"""
+        if entity.pixel_x < view.right and entity.pixel_y < view.bottom and \
+                entity.pixel_x + entity.render_w > view.left and entity.pixel_y + entity.render_h > view.top:
+            return True
+        self.render_queue.count_culled(1)
+        return False
 
-    def run(self):
-        while self.running:
+    def draw_map(self, surface, cam_x, cam_y):
+        """Cover surface with the map (black off the map) as seen from the camera"""
+        if self.map_scroll is not None:
+            self.map_scroll.draw(surface, self.game_map.renderer, cam_x, cam_y)
+        else:
+            surface.fill((0, 0, 0))
+            self.game_map.draw(surface, cam_x, cam_y)
+
+    def restore_background(self, screen, cam_x, cam_y):
+        """Dirty-rect mode: put the map back under last frame's drawing.
+
+        The map at the current camera is cached in self.background; the whole
+        of it is copied when the camera, map or screen size changed (returns
+        True), otherwise only the rects drawn last frame are.
+        """
+        size = screen.get_size()
+        key = (cam_x, cam_y, id(self.game_map), self.game_map.renderer.generation, size)
+        full_redraw = key != self.background_key or self.profiler.show_overlay
+        if key != self.background_key:
+            if self.background is None or self.background.get_size() != size:
+                self.background = pygame.Surface(size).convert()
+            self.draw_map(self.background, cam_x, cam_y)
+            self.background_key = key
+        if full_redraw:
+            screen.blit(self.background, (0, 0))
+        else:
+            for rect in self.drawn_rects + self.quiet_drawn_rects:
+                screen.blit(self.background, rect, rect)
+        screen.clear_rects()
+        return full_redraw
+
+    def present_dirty_rects(self, screen, full_redraw):
+        """Copy the changed regions of the back buffer to the display.
+
+        Returns the rects to pass to display.update(), or None when the whole
+        screen should be flipped.
+        """
+        drawn, quiet = screen.rects, screen.quiet_rects
+        update_rects = None
+        if not full_redraw:
+            # Where things are now, where they were, the HUD widgets that
+            # changed and any static UI that wasn't drawn again
+            update_rects = self.drawn_rects + drawn + self.hud_dirty_rects + \
+                [rect for rect in self.quiet_drawn_rects if rect not in quiet]
+            area = sum(rect.width * rect.height for rect in update_rects)
+            if area * 2 > self.screen_width * self.screen_height:
+                update_rects = None
+        if update_rects is None:
+            self.screen.blit(screen, (0, 0))
+        else:
+            for rect in update_rects:
+                self.screen.blit(screen, rect, rect)
+        self.drawn_rects = drawn
+        self.quiet_drawn_rects = quiet
+        return update_rects
+
+    def step(self, draw=True, ticks=1):
+        """Run one frame: handle_events, update for a number of ticks (none once
+        the game has quit), optionally draw, then move the input on"""
+        self.profiler.begin_frame()
+        self.audio.update()
+        if self.prefetcher is not None:
+            self.prefetcher.poll()
+        with self.profiler.section('handle_events'):
             self.handle_events()
+        steps = 0
+        while steps < ticks and self.running:
+            self.snapshot_positions()
             self.update()
+            steps += 1
+        if draw:
             self.draw()
-            self.clock.tick(100)
+        self.input.advance(steps)
+        self.profiler.end_frame()
+
+    def run_loading(self):
+        """Run the remaining startup stages one per frame behind the loading screen.
+
+        Returns the time the first loading frame was shown, or None if there
+        was nothing left to load.
+        """
+        first_frame = None
+        while self.running and self.startup_stages:
+            # Only the window closing matters here; it isn't game input, so
+            # it bypasses the input source (and any recording)
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.running = False
+            self.draw_loading_screen()
+            if first_frame is None:
+                first_frame = time.perf_counter()
+            self.run_startup_stage()
+            self.clock.tick(60)
+        return first_frame
+
+    def run(self):
+        """Fixed-timestep loop: simulate at TICK_RATE, render as fast as render_pacing allows"""
+        first_loading_frame = self.run_loading()
+        first_frame = None
+        tick = 1.0 / self.TICK_RATE
+        accumulator = 0.0
+        last = time.perf_counter()
+        while self.running:
+            now = time.perf_counter()
+            accumulator += now - last
+            last = now
+
+            self.profiler.begin_frame()
+            self.audio.update()
+            if self.prefetcher is not None:
+                self.prefetcher.poll()
+            with self.profiler.section('handle_events'):
+                self.handle_events()
+            steps = 0
+            while accumulator >= tick and self.running:
+                self.snapshot_positions()
+                self.update()
+                accumulator -= tick
+                steps += 1
+                if steps >= self.max_catchup_ticks:
+                    # Too far behind to catch up; drop the backlog instead of spiralling
+                    accumulator = min(accumulator, tick)
+                    break
+
+            if first_frame is None:
+                draw_start = time.perf_counter()
+            self.draw(accumulator / tick)
+            if first_frame is None:
+                first_frame = time.perf_counter()
+                self.startup_times['first_frame'] = first_frame - draw_start
+                if self.measure_startup:
+                    print(json.dumps(self.startup_report(first_frame, first_loading_frame), indent=2))
+                    self.running = False
+            # Input moves on once per frame, however many ticks it ran, as in step()
+            self.input.advance(steps)
+            self.profiler.end_frame()
+            if isinstance(self.render_pacing, (int, float)):
+                self.clock.tick(self.render_pacing)
+            else:
+                self.clock.tick()
+        self.input.close()
+        self.profiler.save_trace()
+        self.shutdown()
+
+    def shutdown(self):
+        """Stop the prefetch and audio workers and close pygame"""
+        if self.prefetcher is not None:
+            self.prefetcher.shutdown()
+        self.audio.shutdown()
+        text_cache.drop_fonts()
         pygame.quit()
 
 
-def find_tmx_file():
+def find_tmx_file(verbose=False):
+    """First TMX map found next to the script or in the cwd; verbose lists every candidate"""
     script_dir = os.path.dirname(os.path.abspath(__file__))
     cwd = os.getcwd()
 
@@ -2078,20 +4949,24 @@ def find_tmx_file():
     for d in search_dirs:
         map_dir = os.path.join(d, "map")
         if os.path.exists(map_dir) and os.path.isdir(map_dir):
-            print(f"Contents of 'map' folder ({map_dir}):")
+            if verbose:
+                print(f"Contents of 'map' folder ({map_dir}):")
             for file in os.listdir(map_dir):
                 if file.endswith('.tmx'):
-                    print(f"  - {file}")
+                    if verbose:
+                        print(f"  - {file}")
                     possible_paths.append(os.path.join(map_dir, file))
-        else:
+        elif verbose:
             print(f"'map' folder not found at: {map_dir}")
 
     for d in search_dirs:
-        print(f"\nTMX files in directory: {d}")
+        if verbose:
+            print(f"\nTMX files in directory: {d}")
         try:
             for file in os.listdir(d):
                 if file.endswith('.tmx'):
-                    print(f"  - {file}")
+                    if verbose:
+                        print(f"  - {file}")
                     possible_paths.append(os.path.join(d, file))
         except Exception:
             pass
@@ -2109,7 +4984,8 @@ def find_tmx_file():
 
     for path in cleaned:
         if os.path.exists(path):
-            print(f"\nUsing map file: {path}")
+            if verbose:
+                print(f"\nUsing map file: {path}")
             return path
 
     print("\nERROR: No TMX file found!")
@@ -2119,20 +4995,392 @@ def find_tmx_file():
     return None
 
 
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def summarize_timings(samples):
+    """Mean/percentile summary of a list of durations in seconds, reported in ms"""
+    ordered = sorted(samples)
+    return {
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 4) if ordered else 0.0,
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 4),
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 4),
+        'max_ms': round(ordered[-1] * 1000, 4) if ordered else 0.0,
+    }
+
+
+def run_benchmark(map_paths, ticks=300, slimes=50, towers=4, projectiles=200, seed=0, profiler=None,
+                  simulation_lod=False, use_projectile_pool=False):
+    """Load each map headless, populate it and time events/update/draw for a number of ticks
+
+    With an enabled profiler each map's report also gets its section breakdown.
+    """
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    game = Game(map_paths[0], fullscreen=False, headless=True, profiler=profiler, seed=seed,
+                simulation_lod=simulation_lod, use_projectile_pool=use_projectile_pool)
+    prof = game.profiler
+    first_load_time = time.perf_counter() - start
+    game.dialogue.active = False
+    results = []
+
+    for path in map_paths:
+        name = os.path.basename(path)
+        start = time.perf_counter()
+        if path != game.current_map:
+            game.load_map(path)
+            load_time = time.perf_counter() - start
+        else:
+            load_time = first_load_time
+        if game.current_map != path:
+            results.append({'map': name, 'error': game.message or 'failed to load'})
+            continue
+
+        game_map = game.game_map
+        map_w = game_map.width * game_map.tile_w
+        map_h = game_map.height * game_map.tile_h
+        game.set_slimes(spawn_slimes_randomly(game_map, count=slimes, rng=game.rng))
+        tower_types = ['fire', 'water', 'void', 'ice', 'lightning', 'holy']
+        game.towers = list(game_map.towers)
+        for _ in range(towers):
+            tower = Tower(rng.randint(0, max(0, game_map.width - 3)) * game_map.tile_w,
+                          rng.randint(0, max(0, game_map.height - 3)) * game_map.tile_h,
+                          game_map.tile_w, game_map.tile_h, rng.choice(tower_types))
+            game.towers.append(tower)
+        Projectile.pool.release_all(game.projectiles)
+        game.projectiles = []
+        if game.projectile_pool is not None:
+            game.projectile_pool.clear()
+        for _ in range(projectiles):
+            game.add_projectile(Projectile.pool.acquire(rng.uniform(0, map_w), rng.uniform(0, map_h),
+                                                        rng.uniform(0, map_w), rng.uniform(0, map_h), 10,
+                                                        is_enemy=rng.random() < 0.5,
+                                                        projectile_type=rng.choice(tower_types)))
+
+        prof.reset()
+        phases = {'events': [], 'update': [], 'draw': []}
+        for _ in range(ticks):
+            prof.begin_frame()
+            game.audio.update()
+            if game.prefetcher is not None:
+                game.prefetcher.poll()
+            t0 = time.perf_counter()
+            with prof.section('handle_events'):
+                game.handle_events()
+            t1 = time.perf_counter()
+            game.snapshot_positions()
+            game.update()
+            t2 = time.perf_counter()
+            game.draw()
+            t3 = time.perf_counter()
+            game.input.advance()
+            prof.end_frame()
+            phases['events'].append(t1 - t0)
+            phases['update'].append(t2 - t1)
+            phases['draw'].append(t3 - t2)
+
+        frames = [e + u + d for e, u, d in zip(*phases.values())]
+        result = {
+            'map': name,
+            'load_ms': round(load_time * 1000, 3),
+            'ticks': ticks,
+            'slimes': len(game.slimes),
+            'towers': len(game.towers),
+            'projectiles_spawned': projectiles,
+            'phases': {phase: summarize_timings(samples) for phase, samples in phases.items()},
+            'frame': summarize_timings(frames),
+            'pools': pool_stats(),
+            'render_queue': game.render_queue.stats(),
+            'lod': game.lod.stats() if game.lod is not None else None,
+        }
+        if prof.enabled:
+            result['profile'] = prof.summary()
+        results.append(result)
+
+    game.shutdown()
+    return {'ticks': ticks, 'slimes': slimes, 'towers': towers, 'projectiles': projectiles,
+            'seed': seed, 'simulation_lod': simulation_lod,
+            'projectile_pool': game.projectile_pool is not None, 'maps': results}
+
+
+def check_projectile_pool(tmx_file, ticks=300, slimes=50, projectiles=200, seed=0):
+    """Run one projectile scenario through the Projectile objects and the ProjectilePool and compare
+
+    Half the projectiles are fired at slimes from close by and half at the
+    player, so hits, crits and kills land; the report says how many slimes
+    were hit and killed.
+    """
+    results = []
+    for use_pool in (False, True):
+        game = Game(tmx_file, fullscreen=False, headless=True, use_projectile_pool=use_pool, seed=seed)
+        game.dialogue.active = False
+        game.set_slimes(spawn_slimes_randomly(game.game_map, count=slimes, rng=game.rng))
+        rng = random.Random(seed)
+        player = game.player
+        for _ in range(projectiles):
+            if rng.random() < 0.5:
+                is_enemy = False
+                target = rng.choice(game.slimes).hitbox.center
+            else:
+                is_enemy = True
+                target = (player.pixel_x + player.tile_w // 2, player.pixel_y + player.tile_h // 2)
+            x = target[0] + rng.uniform(-200, 200)
+            y = target[1] + rng.uniform(-200, 200)
+            game.add_projectile(Projectile.pool.acquire(x, y, target[0], target[1], rng.randint(5, 40),
+                                                        is_enemy=is_enemy, projectile_type='fire'))
+        for _ in range(ticks):
+            game.snapshot_positions()
+            game.update()
+        results.append({'checksum': game.state_checksum(),
+                        'slimes_hit': sum(s.health < s.max_health for s in game.slimes),
+                        'slimes_killed': sum(s.state == State.DEAD for s in game.slimes),
+                        'player_health': player.health,
+                        'pool': game.projectile_pool is not None})
+        game.shutdown()
+
+    objects, pool = results
+    return {'ticks': ticks, 'slimes': slimes, 'projectiles': projectiles, 'seed': seed,
+            'slimes_hit': objects['slimes_hit'], 'slimes_killed': objects['slimes_killed'],
+            'player_health': objects['player_health'],
+            'object_checksum': objects['checksum'], 'pool_checksum': pool['checksum'],
+            'pool_available': pool['pool'], 'match': objects['checksum'] == pool['checksum']}
+
+
+def play_input_log(path, map_dir, draw=False, profiler=None):
+    """Replay an InputRecorder log headless, frame after frame with no frame cap
+
+    Each recorded frame handles its events and runs as many ticks as it did
+    live. Drawing is off by default since it doesn't affect the simulation.
+    The report ends with a checksum of the final game state.
+    """
+    header, script, frame_ticks = load_input_log(path)
+    start = time.perf_counter()
+    game = Game(os.path.join(map_dir, header['map']), fullscreen=False, headless=True,
+                input_source=ScriptedInput(script), profiler=profiler, seed=header['seed'],
+                simulation_lod=header['simulation_lod'],
+                retain_map_state=header['retain_map_state'])
+    load_time = time.perf_counter() - start
+    prof = game.profiler
+    prof.reset()
+
+    samples = []
+    start = time.perf_counter()
+    for ticks in frame_ticks:
+        if not game.running:
+            break
+        t0 = time.perf_counter()
+        game.step(draw=draw, ticks=ticks)
+        samples.append(time.perf_counter() - t0)
+    wall_time = time.perf_counter() - start
+
+    report = {
+        'log': os.path.basename(path),
+        'map': header['map'],
+        'seed': header['seed'],
+        'simulation_lod': header['simulation_lod'],
+        'retain_map_state': header['retain_map_state'],
+        'frames': len(samples),
+        'recorded_frames': len(script),
+        'ticks': game.ticks,
+        'recorded_ticks': sum(frame_ticks),
+        'load_ms': round(load_time * 1000, 3),
+        'wall_ms': round(wall_time * 1000, 3),
+        'ticks_per_second': round(game.ticks / wall_time, 1) if wall_time > 0 else None,
+        'frame': summarize_timings(samples),
+        'final_map': os.path.basename(game.current_map or ''),
+        'checksum': game.state_checksum(),
+    }
+    if prof.enabled:
+        report['profile'] = prof.summary()
+    game.shutdown()
+    return report
+
+
+def random_input_script(frames, seed=0):
+    """A ScriptedInput script of random walking, running, attacks, clicks and interactions"""
+    rng = random.Random(seed)
+    moves = (pygame.K_a, pygame.K_d, pygame.K_w, pygame.K_s, pygame.K_LSHIFT)
+    held = ()
+    script = []
+    for _ in range(frames):
+        if rng.random() < 0.05:
+            held = tuple(rng.sample(moves, rng.randint(0, 2)))
+        events = []
+        if rng.random() < 0.05:
+            events.append(pygame.event.Event(pygame.KEYDOWN, key=rng.choice((pygame.K_SPACE, pygame.K_e)), mod=0))
+        if rng.random() < 0.05:
+            events.append(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1,
+                                             pos=(rng.randrange(800), rng.randrange(600))))
+        script.append((held, events, 0))
+    return script
+
+
+def check_input_loops(tmx_file, script, seed=0):
+    """Feed one ScriptedInput script through run() and through step() and compare the end states.
+
+    run() takes its ticks per frame from the wall clock, so step() is handed
+    the counts run() used. A QUIT is appended to end run().
+    """
+    script = list(script) + [((), [pygame.event.Event(pygame.QUIT)], 0)]
+    live = ScriptedInput(script)
+    game = Game(tmx_file, fullscreen=False, headless=True, input_source=live, seed=seed)
+    game.run()
+    run_checksum = game.state_checksum()
+    run_ticks = game.ticks
+
+    game = Game(tmx_file, fullscreen=False, headless=True, input_source=ScriptedInput(script), seed=seed)
+    for ticks in live.frame_ticks:
+        if not game.running:
+            break
+        game.step(draw=False, ticks=ticks)
+    report = {'frames': len(live.frame_ticks), 'ticks': run_ticks,
+              'run_checksum': run_checksum, 'step_checksum': game.state_checksum()}
+    report['match'] = report['run_checksum'] == report['step_checksum'] and game.ticks == run_ticks
+    game.shutdown()
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Medieval RPG")
+    parser.add_argument('mode', nargs='?', default='',
+                        help="pass 'fullscreen' to start in fullscreen mode")
+    parser.add_argument('-f', '--fullscreen', action='store_true',
+                        help='start in fullscreen mode')
+    parser.add_argument('--bench', action='store_true',
+                        help='run the headless benchmark over every map and print JSON timings')
+    parser.add_argument('--ticks', type=int, default=300,
+                        help='ticks to simulate per map when benchmarking')
+    parser.add_argument('--slimes', type=int, default=50,
+                        help='slimes to spawn per map when benchmarking')
+    parser.add_argument('--towers', type=int, default=4,
+                        help='extra towers to spawn per map when benchmarking')
+    parser.add_argument('--projectiles', type=int, default=200,
+                        help='projectiles to spawn per map when benchmarking')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='random seed for the game (and benchmark spawns, default 0)')
+    parser.add_argument('--record', default=None, metavar='FILE',
+                        help='record each frame of input, with the ticks it ran and the seed, to this file for --play')
+    parser.add_argument('--play', default=None, metavar='FILE',
+                        help='replay a --record log headless as fast as possible and print JSON with the final state checksum')
+    parser.add_argument('--output', default=None,
+                        help='write benchmark JSON to this file instead of stdout')
+    parser.add_argument('--build-atlas', action='store_true',
+                        help='pack the sprites in image/ into image/atlas.png + atlas.json and exit')
+    parser.add_argument('--bake-maps', action='store_true',
+                        help='compile every map into map/.cache so later loads skip TMX parsing, then exit')
+    parser.add_argument('--profile', action='store_true',
+                        help='time frame sections and show the profiler overlay (toggle with F3)')
+    parser.add_argument('--trace', default=None,
+                        help='write a Chrome trace (chrome://tracing, Perfetto) of the frame sections to this file')
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help='redraw and update only the screen regions that changed while the camera is still')
+    parser.add_argument('--lod', action='store_true',
+                        help='update distant slimes, bosses and towers less often (also when benchmarking)')
+    parser.add_argument('--projectile-pool', action='store_true',
+                        help='keep projectiles in NumPy arrays instead of objects (also when benchmarking)')
+    parser.add_argument('--check-pool', action='store_true',
+                        help='fire --projectiles projectiles at --slimes slimes and the player for --ticks ticks '
+                             'with and without --projectile-pool and check both end in the same state')
+    parser.add_argument('--keep-map-state', action='store_true',
+                        help="keep a map's slimes when leaving it, so cleared maps stay cleared")
+    parser.add_argument('--check-input', action='store_true',
+                        help='play a random input script (--ticks frames, --seed) through run() and step() '
+                             'and check both end in the same state')
+    parser.add_argument('--measure-startup', action='store_true',
+                        help='print time-to-first-frame broken down by startup stage as JSON, then exit')
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
+    args = parse_args()
     script_dir = os.path.dirname(os.path.abspath(__file__))
     main_map_path = os.path.join(script_dir, "map", "main_map.tmx")
     if not os.path.exists(main_map_path):
         print("main_map.tmx not found in the map folder!")
         sys.exit(1)
 
-    start_fullscreen = False
-    if len(sys.argv) > 1 and sys.argv[1].lower() in ['fullscreen', '-f', '--fullscreen']:
-        start_fullscreen = True
+    if args.build_atlas:
+        build_atlas(os.path.join(script_dir, "image"))
+        sys.exit(0)
+
+    profiler = FrameProfiler(enabled=args.profile, trace_path=args.trace)
+
+    map_dir = os.path.join(script_dir, "map")
+    map_paths = [main_map_path] + sorted(
+        os.path.join(map_dir, f) for f in os.listdir(map_dir)
+        if f.endswith('.tmx') and not f.endswith('_fixed.tmx') and f != 'main_map.tmx')
+
+    if args.bake_maps:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        pygame.display.init()
+        pygame.display.set_mode((1, 1))
+        for path in map_paths:
+            try:
+                GameMap(path, cache=map_cache)
+            except Exception as e:
+                print(f"Could not bake {os.path.basename(path)}: {e}")
+        pygame.quit()
+        sys.exit(0)
+
+    if args.bench:
+        # Keep the game's own logging off stdout so the JSON stays parseable
+        with contextlib.redirect_stdout(sys.stderr):
+            report = run_benchmark(map_paths, ticks=args.ticks, slimes=args.slimes,
+                                   towers=args.towers, projectiles=args.projectiles,
+                                   seed=args.seed if args.seed is not None else 0,
+                                   profiler=profiler, simulation_lod=args.lod,
+                                   use_projectile_pool=args.projectile_pool)
+            profiler.save_trace()
+        output = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+        else:
+            print(output)
+        sys.exit(0)
+
+    if args.check_pool:
+        with contextlib.redirect_stdout(sys.stderr):
+            report = check_projectile_pool(main_map_path, ticks=args.ticks, slimes=args.slimes,
+                                           projectiles=args.projectiles,
+                                           seed=args.seed if args.seed is not None else 0)
+        print(json.dumps(report, indent=2))
+        sys.exit(0 if report['match'] else 1)
+
+    if args.check_input:
+        seed = args.seed if args.seed is not None else 0
+        with contextlib.redirect_stdout(sys.stderr):
+            report = check_input_loops(main_map_path, random_input_script(args.ticks, seed), seed)
+        print(json.dumps(report, indent=2))
+        sys.exit(0 if report['match'] else 1)
+
+    if args.play:
+        with contextlib.redirect_stdout(sys.stderr):
+            report = play_input_log(args.play, map_dir, profiler=profiler)
+            profiler.save_trace()
+        print(json.dumps(report, indent=2))
+        sys.exit(0)
+
+    start_fullscreen = args.fullscreen or args.mode.lower() == 'fullscreen'
+    seed = args.seed if args.seed is not None else random.getrandbits(64)
+    input_source = None
+    if args.record:
+        input_source = InputRecorder(LiveInput(), args.record, seed, os.path.basename(main_map_path),
+                                     simulation_lod=args.lod, retain_map_state=args.keep_map_state)
 
     try:
-        game = Game(main_map_path, fullscreen=start_fullscreen)
+        profiler.show_overlay = args.profile
+        game = Game(main_map_path, fullscreen=start_fullscreen, profiler=profiler,
+                    staged=True, measure_startup=args.measure_startup, dirty_rects=args.dirty_rects,
+                    input_source=input_source, seed=seed, simulation_lod=args.lod,
+                    retain_map_state=args.keep_map_state, use_projectile_pool=args.projectile_pool)
         game.run()
     except Exception as e:
+        if input_source is not None:
+            input_source.close()
         print(f"\nError starting game: {e}")
         sys.exit(1)
\ No newline at end of file